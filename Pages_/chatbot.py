@@ -1,21 +1,17 @@
 import streamlit as st
 import os
-from langchain.chains import ConversationChain
-from langchain.chains.conversation.memory import ConversationBufferWindowMemory
-from langchain_community.chat_models import ChatOpenAI
-from langchain.prompts import (
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate,
-    ChatPromptTemplate,
-    MessagesPlaceholder
-)
-import openai
-from utils import find_match, get_conversation_string, num_tokens_from_string
+import time
+from config import context_candidates
+from context_packer import pack_context
+from llm_client import get_llm_client
+from metrics import span
+from utils import find_match, get_answer_cache, get_conversation_string, num_tokens_from_string
 
 class YourDataChat:
     def __init__(self):
         self.model_name = "gpt-4o-mini"  # Using gpt-4o-mini as gpt-4.1-nano might not be available yet
         self.api_key = os.environ.get('OPEN_AI_KEY')
+        self.last_metrics = {}
         
     def get_response(self, user_input):
         """Get a response from the chatbot for a given input"""
@@ -36,67 +32,146 @@ class YourDataChat:
     def get_context(self, query):
         """Get relevant context from the knowledge base"""
         try:
-            # Use the simplified find_match function
-            results = find_match(query, top_k=4)
-            return results
+            # Retrieve a few extra candidates, then keep the best that fit the prompt budget
+            results = find_match(query, top_k=context_candidates)
+            with span('context_packing', items=len(results['returned_text'])):
+                packed = pack_context(results, self.model_name)
+            print(f"📦 Packed {len(packed['returned_text'])}/{len(results['returned_text'])} chunks "
+                  f"into {packed['tokens']} prompt tokens")
+            return packed
         except Exception as e:
             st.error(f"Error getting context: {e}")
             return {"returned_text": [], "source": [], "score": []}
     
+    def cached_answer(self, context):
+        """Answer previously generated for a near-identical question over the same chunks, if any"""
+        cache = get_answer_cache()
+        if cache is None or context is None or context.get('query_embedding') is None:
+            return None
+        return cache.get(context['query_embedding'], context['chunk_id'], self.model_name)
+    
+    def cache_answer(self, context, answer):
+        cache = get_answer_cache()
+        if cache is None or context is None or context.get('query_embedding') is None:
+            return
+        if answer.startswith("Error generating response"):
+            return
+        cache.put(context['query_embedding'], context['chunk_id'], context['source'], self.model_name, answer)
+    
+    def build_messages(self, user_input, context):
+        """Build the chat messages for a question and its retrieved context"""
+        # Prepare context
+        context_text = ""
+        if context and context.get('returned_text'):
+            context_text = "\n\n".join(context['returned_text'])
+        
+        # Create system prompt
+        system_prompt = """You are a helpful AI assistant that answers questions based on the provided context from documents. 
+        
+        IMPORTANT INSTRUCTIONS:
+        1. If context is provided, analyze it carefully for ANY relevant information
+        2. Even if the context seems limited, try to extract useful insights from it
+        3. If the context contains figures, tables, or technical content, explain what they show
+        4. If you find ANY relevant information, provide a detailed answer based on it
+        5. Only say "I don't have information about this" if the context is completely irrelevant
+        6. Always mention that you're answering based on the uploaded documents when you use them
+        7. Be specific and cite information from the documents when possible
+        8. If the context shows figures or tables, explain their significance
+        
+        Always be helpful, accurate, and try to provide value even from limited context."""
+        
+        # Prepare messages
+        messages = [
+            {"role": "system", "content": system_prompt}
+        ]
+        
+        # Add context if available
+        if context_text:
+            messages.append({
+                "role": "user", 
+                "content": f"Context from uploaded documents:\n{context_text}\n\nQuestion: {user_input}"
+            })
+        else:
+            messages.append({
+                "role": "user", 
+                "content": f"Question: {user_input}\n\nNote: No relevant information found in uploaded documents."
+            })
+        return messages
+    
     def generate_openai_response(self, user_input, context):
         """Generate response using OpenAI API"""
         try:
-            # Prepare context
-            context_text = ""
-            if context and context.get('returned_text'):
-                context_text = "\n\n".join(context['returned_text'])
-            
-            # Create system prompt
-            system_prompt = """You are a helpful AI assistant that answers questions based on the provided context from documents. 
-            
-            IMPORTANT INSTRUCTIONS:
-            1. If context is provided, analyze it carefully for ANY relevant information
-            2. Even if the context seems limited, try to extract useful insights from it
-            3. If the context contains figures, tables, or technical content, explain what they show
-            4. If you find ANY relevant information, provide a detailed answer based on it
-            5. Only say "I don't have information about this" if the context is completely irrelevant
-            6. Always mention that you're answering based on the uploaded documents when you use them
-            7. Be specific and cite information from the documents when possible
-            8. If the context shows figures or tables, explain their significance
-            
-            Always be helpful, accurate, and try to provide value even from limited context."""
+            start = time.perf_counter()
+            cached = self.cached_answer(context)
+            if cached is not None:
+                total = time.perf_counter() - start
+                self.last_metrics = {"time_to_first_token": total, "total_latency": total, "cached": True}
+                return cached
             
-            # Prepare messages
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Add context if available
-            if context_text:
-                messages.append({
-                    "role": "user", 
-                    "content": f"Context from uploaded documents:\n{context_text}\n\nQuestion: {user_input}"
-                })
-            else:
-                messages.append({
-                    "role": "user", 
-                    "content": f"Question: {user_input}\n\nNote: No relevant information found in uploaded documents."
-                })
+            messages = self.build_messages(user_input, context)
             
             # Call OpenAI API using new format
-            client = openai.OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
+            response, queue_wait = get_llm_client().complete(
+                self.api_key,
                 model=self.model_name,
                 messages=messages,
                 max_tokens=1000,
                 temperature=0.7
             )
+            total = time.perf_counter() - start
+            self.last_metrics = {"time_to_first_token": total, "total_latency": total,
+                                 "queue_wait": queue_wait, "streamed": False}
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            self.cache_answer(context, answer)
+            return answer
             
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
+    def stream_openai_response(self, user_input, context):
+        """Yield the response text piece by piece as the API streams it.
+
+        Time to first token and total latency are left in `self.last_metrics`.
+        """
+        start = time.perf_counter()
+        first_token = None
+        cached = self.cached_answer(context)
+        if cached is not None:
+            self.last_metrics = {"time_to_first_token": time.perf_counter() - start,
+                                 "total_latency": time.perf_counter() - start, "cached": True}
+            yield cached
+            return
+        
+        answer = ""
+        try:
+            messages = self.build_messages(user_input, context)
+            stream = get_llm_client().stream(
+                self.api_key,
+                model=self.model_name,
+                messages=messages,
+                max_tokens=1000,
+                temperature=0.7
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    answer += delta
+                    yield delta
+            self.cache_answer(context, answer)
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+        finally:
+            self.last_metrics = {
+                "time_to_first_token": first_token,
+                "total_latency": time.perf_counter() - start,
+                "streamed": True,
+            }
+    
     def get_conversation_string(self):
         """Get conversation history as string"""
         conversation_string = ""
@@ -1,17 +1,16 @@
 import streamlit as st
-from nucliadb_sdk import NucliaDB
-from sentence_transformers import SentenceTransformer
 
-from config import *
+from knowledge_bases import label, list_knowledge_bases, search
+from models import get_embedding_model
 
 
 class FileUploader:
 
     def __init__(self):
-        self.knowledge_base = st.sidebar.selectbox("Knowledge Base",
-                                                   ["Group 1 Documents", "Group 2 Documents"])
-        self.knowledge_base = "knowledge_base1" if self.knowledge_base == "Group 1 Documents" else self.knowledge_base
-        self.knowledge_base = "knowledge_base2" if self.knowledge_base == "Group 2 Documents" else self.knowledge_base
+        # Searching several knowledge bases fans the query out to their shards and merges by score
+        names = list_knowledge_bases()
+        self.knowledge_bases = st.sidebar.multiselect("Knowledge Base", names, default=names[:1],
+                                                      format_func=label)
 
     def search_knowledge_base(self):
         """
@@ -25,7 +24,9 @@ class FileUploader:
         topk = st.radio("Select the number of top-k results:", [1, 2, 3, 4])
 
         if st.button("Search"):
-            if query:  # Only process if there's a query
+            if not self.knowledge_bases:
+                st.warning("Please select at least one knowledge base.")
+            elif query:  # Only process if there's a query
                 result = self.find_most_similar(query, confidence_score, topk)
                 texts = result['text']
                 scores = result['score']
@@ -45,21 +46,13 @@ class FileUploader:
                 st.warning("Please enter a query to search.")
 
     def find_most_similar(self, input, confidence_score, topk):
-        model = SentenceTransformer(embedding_model)
-
-        query_vectors = model.encode([input])
-        
-        # Create NucliaDB instance with the knowledge base slug
-        my_kb = NucliaDB(region="local", slug=self.knowledge_base)
+        query_vectors = get_embedding_model().encode([input])
         
-        results = my_kb.search(
-            vector=query_vectors[0],
-            vectorset="bge",
-            min_score=confidence_score,
-            page_size=topk)
-        d = {"text": [result.text for result in results],
-             "score": [result.score for result in results],
-             "source": [result.labels[0] for result in results]}
+        # Local shards of the selected knowledge bases: at most `topk` results scoring at least `confidence_score`
+        results = search(query_vectors, self.knowledge_bases, min_score=confidence_score, page_size=topk)
+        d = {"text": [text for _, _, _, text, _, _ in results],
+             "score": [score for score, _, _, _, _, _ in results],
+             "source": [f"{label(knowledge_base)} / {source}" for _, knowledge_base, _, _, source, _ in results]}
 
         return d
 
@@ -1,10 +1,7 @@
 import streamlit as st
-import os
-import pickle
-import faiss
 import sys
 sys.path.append('.')
-from utils import initialize_vector_store, document_texts, document_sources, vector_store
+from utils import initialize_vector_store, get_store
 
 class VectorManager:
     def __init__(self):
@@ -14,29 +11,26 @@ class VectorManager:
         """Display information about the current vector store"""
         st.subheader("📊 Vector Store Information")
         
-        # Import the global variables from utils
-        from utils import vector_store, document_texts, document_sources
+        store = get_store()
+        source_counts = store.source_counts()
         
-        if vector_store is not None and len(document_texts) > 0:
+        if len(source_counts) > 0:
             # Get vector store statistics
-            total_vectors = vector_store.ntotal
-            dimension = vector_store.d
+            total_vectors = store.ntotal
+            dimension = store.dimension
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total Documents", len(set(document_sources)))
+                st.metric("Total Documents", len(source_counts))
             with col2:
                 st.metric("Total Chunks", total_vectors)
             with col3:
                 st.metric("Vector Dimension", dimension)
+            st.caption(f"Index backend: {store.backend} · {store.storage} vectors · "
+                       f"~{store.memory_bytes() / 2**20:.1f} MiB in memory")
             
             # Show document sources
             st.subheader("📁 Document Sources")
-            unique_sources = list(set(document_sources))
-            source_counts = {}
-            for source in unique_sources:
-                source_counts[source] = document_sources.count(source)
-            
             for source, count in source_counts.items():
                 st.info(f"📄 {source}: {count} chunks")
                 
@@ -47,8 +41,8 @@ class VectorManager:
         """View all documents in the vector store"""
         st.subheader("📖 View Documents")
         
-        # Import the global variables from utils
-        from utils import document_texts, document_sources
+        store = get_store()
+        chunk_ids, document_texts, document_sources, document_pages = store.snapshot()
         
         if len(document_texts) == 0:
             st.info("No documents to display.")
@@ -65,34 +59,40 @@ class VectorManager:
         with col2:
             search_term = st.text_input("Search in content:", placeholder="Enter search term...")
         
+        # Keyword lookups go through the inverted index instead of scanning every chunk
+        matching_ids = store.keyword_matches(search_term) if search_term else None
+        
         # Filter documents
         filtered_texts = []
         filtered_sources = []
         filtered_indices = []
+        filtered_pages = []
         
-        for i, (text, source) in enumerate(zip(document_texts, document_sources)):
+        for chunk_id, text, source, page in zip(chunk_ids, document_texts, document_sources, document_pages):
             # Apply source filter
             if selected_source != "All Documents" and source != selected_source:
                 continue
             
             # Apply search filter
-            if search_term and search_term.lower() not in text.lower():
+            if matching_ids is not None and chunk_id not in matching_ids:
                 continue
             
             filtered_texts.append(text)
             filtered_sources.append(source)
-            filtered_indices.append(i)
+            filtered_indices.append(chunk_id)
+            filtered_pages.append(page)
         
         # Display results
         st.write(f"**Showing {len(filtered_texts)} chunks**")
         
-        for i, (text, source, idx) in enumerate(zip(filtered_texts, filtered_sources, filtered_indices)):
-            with st.expander(f"Chunk {idx + 1} - {source} (Click to view)"):
+        for text, source, idx, page in zip(filtered_texts, filtered_sources, filtered_indices, filtered_pages):
+            with st.expander(f"Chunk {idx} - {source} (Click to view)"):
                 st.markdown(f"""
                 <div style='padding: 15px; background-color: #f8f9fa; border-radius: 8px; border: 1px solid #e9ecef;'>
                     <div style='margin-bottom: 10px;'>
                         <strong>Source:</strong> {source}<br>
-                        <strong>Chunk ID:</strong> {idx + 1}<br>
+                        <strong>Chunk ID:</strong> {idx}<br>
+                        <strong>Page:</strong> {page if page is not None else "n/a"}<br>
                         <strong>Length:</strong> {len(text)} characters
                     </div>
                     <div style='background-color: white; padding: 10px; border-radius: 4px; border: 1px solid #dee2e6;'>
@@ -102,106 +102,41 @@ class VectorManager:
                 """, unsafe_allow_html=True)
                 
                 # Delete button for individual chunk
-                if st.button(f"🗑️ Delete Chunk {idx + 1}", key=f"delete_{idx}"):
+                if st.button(f"🗑️ Delete Chunk {idx}", key=f"delete_{idx}"):
                     self.delete_chunk(idx)
                     st.rerun()
     
-    def delete_chunk(self, chunk_index):
+    def delete_chunk(self, chunk_id):
         """Delete a specific chunk from the vector store"""
-        # Import the global variables from utils
-        import utils
-        
-        if 0 <= chunk_index < len(utils.document_texts):
-            # Remove from lists
-            del utils.document_texts[chunk_index]
-            del utils.document_sources[chunk_index]
-            
-            # Rebuild vector store
-            self.rebuild_vector_store()
-            st.success(f"Chunk {chunk_index + 1} deleted successfully!")
+        # Removal by chunk ID touches only that entry; nothing is re-embedded
+        if get_store().remove_ids([chunk_id]):
+            self.save_vector_store()
+            st.success(f"Chunk {chunk_id} deleted successfully!")
         else:
-            st.error("Invalid chunk index!")
+            st.error("Invalid chunk ID!")
     
     def delete_document(self, document_name):
         """Delete all chunks from a specific document"""
-        # Import the global variables from utils
-        import utils
-        
-        # Find indices to remove
-        indices_to_remove = [i for i, source in enumerate(utils.document_sources) if source == document_name]
-        
-        if indices_to_remove:
-            # Remove in reverse order to maintain indices
-            for idx in reversed(indices_to_remove):
-                del utils.document_texts[idx]
-                del utils.document_sources[idx]
-            
-            # Rebuild vector store
-            self.rebuild_vector_store()
+        if get_store().remove_source(document_name):
+            self.save_vector_store()
             st.success(f"All chunks from '{document_name}' deleted successfully!")
         else:
             st.error(f"No chunks found for document '{document_name}'!")
     
-    def rebuild_vector_store(self):
-        """Rebuild the vector store from current document_texts"""
-        # Import the global variables from utils
-        import utils
-        
-        if utils.document_texts:
-            from sentence_transformers import SentenceTransformer
-            from config import embedding_model
-            
-            model = SentenceTransformer(embedding_model)
-            embeddings = model.encode(utils.document_texts)
-            
-            # Create new vector store
-            dimension = model.get_sentence_embedding_dimension()
-            utils.vector_store = faiss.IndexFlatIP(dimension)
-            utils.vector_store.add(embeddings.astype('float32'))
-            
-            # Save the updated vector store
-            self.save_vector_store()
-        else:
-            # Create empty vector store
-            from sentence_transformers import SentenceTransformer
-            from config import embedding_model
-            
-            model = SentenceTransformer(embedding_model)
-            dimension = model.get_sentence_embedding_dimension()
-            utils.vector_store = faiss.IndexFlatIP(dimension)
-            
-            # Save the empty vector store
-            self.save_vector_store()
-    
     def save_vector_store(self):
         """Save the current vector store"""
-        # Import the global variables from utils
-        import utils
-        
-        if utils.vector_store is not None:
-            try:
-                os.makedirs('vector_store', exist_ok=True)
-                faiss.write_index(utils.vector_store, 'vector_store/index.faiss')
-                metadata = {
-                    'texts': utils.document_texts,
-                    'sources': utils.document_sources
-                }
-                with open('vector_store/metadata.pkl', 'wb') as f:
-                    pickle.dump(metadata, f)
-                st.success("Vector store saved successfully")
-            except Exception as e:
-                st.error(f"Error saving vector store: {e}")
+        try:
+            get_store().save()
+            st.success("Vector store saved successfully")
+        except Exception as e:
+            st.error(f"Error saving vector store: {e}")
     
     def clear_all_data(self):
         """Clear all data from the vector store"""
-        # Import the global variables from utils
-        import utils
-        
         if st.button("🗑️ Clear All Data", type="primary"):
             if st.checkbox("I understand this will delete ALL documents and cannot be undone"):
-                utils.document_texts = []
-                utils.document_sources = []
-                self.rebuild_vector_store()
+                get_store().clear()
+                self.save_vector_store()
                 st.success("All data cleared successfully!")
                 st.rerun()
     
@@ -209,8 +144,7 @@ class VectorManager:
         """Export vector store data"""
         st.subheader("📤 Export Data")
         
-        # Import the global variables from utils
-        from utils import document_texts, document_sources
+        chunk_ids, document_texts, document_sources, document_pages = get_store().snapshot()
         
         if len(document_texts) > 0:
             # Create export data
@@ -220,11 +154,12 @@ class VectorManager:
             
             # Group by source
             source_groups = {}
-            for i, (text, source) in enumerate(zip(document_texts, document_sources)):
+            for chunk_id, text, source, page in zip(chunk_ids, document_texts, document_sources, document_pages):
                 if source not in source_groups:
                     source_groups[source] = []
                 source_groups[source].append({
-                    'chunk_id': i + 1,
+                    'chunk_id': chunk_id,
+                    'page': page,
                     'text': text,
                     'length': len(text)
                 })
@@ -271,14 +206,10 @@ class VectorManager:
         elif option == "🗑️ Delete Documents":
             st.subheader("🗑️ Delete Documents")
             
-            # Import the global variables from utils
-            from utils import document_texts, document_sources
+            source_counts = get_store().source_counts()
             
-            if len(document_texts) > 0:
-                unique_sources = list(set(document_sources))
-                
-                for source in unique_sources:
-                    count = document_sources.count(source)
+            if len(source_counts) > 0:
+                for source, count in source_counts.items():
                     col1, col2 = st.columns([3, 1])
                     
                     with col1:
@@ -0,0 +1,290 @@
+import argparse
+import math
+import time
+
+import faiss
+import numpy as np
+
+from config import (ann_backend, ann_switch_threshold, hnsw_ef_construction, hnsw_ef_search, hnsw_m,
+                    index_backend, ivf_nlist, ivf_nprobe, ivfpq_m, pq_m, vector_storage)
+
+SCALAR_QUANTIZERS = {'fp16': faiss.ScalarQuantizer.QT_fp16, 'int8': faiss.ScalarQuantizer.QT_8bit}
+
+
+def _nlist_for(n):
+    if ivf_nlist:
+        return ivf_nlist
+    # ~4*sqrt(n) lists, keeping at least 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def min_training_size(backend, storage='float32'):
+    """Fewest vectors needed before `backend` with `storage` can be trained"""
+    size = 0
+    if backend == 'ivf':
+        size = 39
+    if backend == 'ivfpq' or storage == 'pq':
+        size = 256 * 39
+    if storage == 'int8':
+        size = max(size, 1000)
+    return size
+
+
+def target_backend(n):
+    """Backend the store should use for n chunks under the configured policy"""
+    backend = index_backend
+    if backend == 'auto':
+        backend = ann_backend if n >= ann_switch_threshold else 'flat'
+    if n < min_training_size(backend):
+        return 'flat'
+    return backend
+
+
+def target_storage(backend, n, current='float32'):
+    """Vector encoding for `backend` with n chunks; keeps `current` while there is too little data to train"""
+    if backend == 'ivfpq':
+        return 'pq'
+    if backend == 'hnsw':
+        return 'float32'
+    if n < min_training_size(backend, vector_storage):
+        return current
+    return vector_storage
+
+
+def new_index(backend, dimension, training_vectors=None, storage='float32'):
+    """Create an empty, trained index of the given backend and vector storage that accepts add_with_ids"""
+    if backend == 'flat':
+        if storage == 'float32':
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        if storage == 'pq':
+            codes = faiss.IndexPQ(dimension, pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            codes = faiss.IndexScalarQuantizer(dimension, SCALAR_QUANTIZERS[storage], faiss.METRIC_INNER_PRODUCT)
+        if not codes.is_trained:
+            codes.train(np.ascontiguousarray(training_vectors, dtype='float32'))
+        return faiss.IndexIDMap2(codes)
+
+    if backend == 'hnsw':
+        hnsw = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = hnsw_ef_construction
+        index = faiss.IndexIDMap2(hnsw)
+    elif backend in ('ivf', 'ivfpq'):
+        nlist = _nlist_for(len(training_vectors))
+        quantizer = faiss.IndexFlatIP(dimension)
+        if backend == 'ivf' and storage in SCALAR_QUANTIZERS:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, SCALAR_QUANTIZERS[storage],
+                                                  faiss.METRIC_INNER_PRODUCT)
+        elif backend == 'ivf' and storage == 'float32':
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, ivfpq_m, 8, faiss.METRIC_INNER_PRODUCT)
+        # k-means does not need more than a few hundred points per list
+        sample = training_vectors
+        if len(sample) > nlist * 256:
+            rows = np.random.default_rng(0).choice(len(sample), nlist * 256, replace=False)
+            sample = sample[np.sort(rows)]
+        index.train(np.ascontiguousarray(sample, dtype='float32'))
+        # The direct map lets us reconstruct and remove vectors by chunk ID
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    else:
+        raise ValueError(f"Unknown index backend '{backend}'")
+
+    configure_search(index)
+    return index
+
+
+def backend_of(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(index, faiss.IndexIVFPQ):
+        return 'ivfpq'
+    if isinstance(index, faiss.IndexIVF):
+        return 'ivf'
+    return 'flat'
+
+
+def storage_of(index):
+    """How an index built by `new_index` encodes its vectors"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return 'pq'
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return 'fp16' if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else 'int8'
+    return 'float32'
+
+
+def memory_bytes(index):
+    """Approximate resident size of an index built by `new_index`"""
+    downcast = faiss.downcast_index(index)
+    total = 0
+    if isinstance(downcast, faiss.IndexIDMap):
+        total += 16 * downcast.ntotal  # ID map plus IndexIDMap2's reverse map
+        downcast = faiss.downcast_index(downcast.index)
+    n = downcast.ntotal
+    if isinstance(downcast, faiss.IndexIVF):
+        # Centroids, then per vector: code, inverted-list ID and direct-map entry
+        total += downcast.nlist * downcast.d * 4 + n * (downcast.code_size + 8 + 16)
+    elif isinstance(downcast, faiss.IndexHNSW):
+        total += n * (4 * downcast.d + 4 * downcast.hnsw.nb_neighbors(0))
+    else:
+        total += n * downcast.code_size
+    if isinstance(downcast, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        total += downcast.pq.M * downcast.pq.ksub * downcast.pq.dsub * 4  # codebooks
+    return total
+
+
+def configure_search(index, nprobe=ivf_nprobe, ef_search=hnsw_ef_search):
+    """Apply the query-time knobs (IVF nprobe, HNSW efSearch)"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def needs_retrain(index, n):
+    """An IVF index trained on a much smaller corpus has too few lists; retrain it"""
+    downcast = faiss.downcast_index(index)
+    if isinstance(downcast, faiss.IndexIVF) and not ivf_nlist:
+        return _nlist_for(n) >= 2 * downcast.nlist
+    return False
+
+
+def removal_selector(index, ids):
+    ids = np.asarray(ids, dtype='int64')
+    # The IVF direct-map hashtable only accepts an explicit ID array
+    if isinstance(faiss.downcast_index(index), faiss.IndexIVF):
+        return faiss.IDSelectorArray(ids)
+    return faiss.IDSelectorBatch(ids)
+
+
+def supports_removal(index):
+    # HNSW graphs cannot drop nodes; deleted chunks are filtered out until the next rebuild
+    return backend_of(index) != 'hnsw'
+
+
+def extract_vectors(index):
+    """Return (ids, vectors) for everything stored in an index built by `new_index`"""
+    downcast = faiss.downcast_index(index)
+    if isinstance(downcast, faiss.IndexIDMap):
+        ids = faiss.vector_to_array(downcast.id_map).astype('int64')
+        vectors = faiss.downcast_index(downcast.index).reconstruct_n(0, downcast.ntotal)
+        return ids, vectors
+    if isinstance(downcast, faiss.IndexIVF):
+        invlists = downcast.invlists
+        ids = np.concatenate([
+            faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+            for list_no in range(downcast.nlist)
+        ] or [np.empty(0, dtype='int64')]).astype('int64')
+        # IVF-PQ only stores codes, so these are approximations of the originals
+        vectors = downcast.reconstruct_batch(ids) if len(ids) else np.empty((0, downcast.d), dtype='float32')
+        return ids, vectors
+    raise ValueError("Unsupported index type")
+
+
+def build_index(backend, dimension, ids, vectors, storage='float32'):
+    """Train a `backend` index on the given vectors and fill it"""
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    index = new_index(backend, dimension, training_vectors=vectors, storage=storage)
+    if len(ids):
+        index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+    return index
+
+
+def rescore(query, labels, vectors, top_k):
+    """Order candidate labels by exact inner product with the query and keep top_k"""
+    labels = labels[labels >= 0]
+    scores = vectors[labels] @ query
+    return labels[np.argsort(-scores)[:top_k]]
+
+
+def recall_report(vectors, backends=('ivf', 'hnsw', 'ivfpq'), storages=('fp16', 'int8', 'pq'), n_queries=200,
+                  top_k=10, nprobe_values=(1, 4, 16, 64), ef_search_values=(16, 32, 64, 128), rescore_factor=4):
+    """Recall@k, single-query latency and memory of each backend/storage against an exact flat scan"""
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    n, dimension = vectors.shape
+    ids = np.arange(n, dtype='int64')
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(n, min(n_queries, n), replace=False)]
+
+    def timed_search(index, factor=1):
+        latencies = []
+        labels = []
+        for query in queries:
+            start = time.perf_counter()
+            _, found = index.search(query[None, :], top_k * factor)
+            found = rescore(query, found[0], vectors, top_k) if factor > 1 else found[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            labels.append(found)
+        return labels, np.array(latencies)
+
+    def row(backend, param, found, latency, build_s, index):
+        recall = np.mean([len(set(f) & set(t)) / top_k for f, t in zip(found, truth)])
+        return {'backend': backend, 'param': param, 'recall': float(recall),
+                'p50_ms': float(np.percentile(latency, 50)), 'p95_ms': float(np.percentile(latency, 95)),
+                'build_s': build_s, 'bytes_per_vector': memory_bytes(index) / n}
+
+    flat = build_index('flat', dimension, ids, vectors)
+    truth, flat_latency = timed_search(flat)
+    rows = [row('flat', None, truth, flat_latency, 0.0, flat)]
+
+    for storage in storages:
+        if n < min_training_size('flat', storage):
+            continue
+        start = time.perf_counter()
+        index = build_index('flat', dimension, ids, vectors, storage=storage)
+        build_s = time.perf_counter() - start
+        # Without and with an exact re-score of rescore_factor * top_k candidates
+        for factor in (1, rescore_factor):
+            found, latency = timed_search(index, factor)
+            rows.append(row(f'flat-{storage}', 'rescore' if factor > 1 else None, found, latency, build_s, index))
+
+    for backend in backends:
+        if n < min_training_size(backend):
+            continue
+        start = time.perf_counter()
+        index = build_index(backend, dimension, ids, vectors)
+        build_s = time.perf_counter() - start
+        sweep = ef_search_values if backend == 'hnsw' else nprobe_values
+        for value in sweep:
+            if backend == 'hnsw':
+                configure_search(index, ef_search=value)
+            else:
+                configure_search(index, nprobe=value)
+            found, latency = timed_search(index)
+            rows.append(row(backend, value, found, latency, build_s, index))
+    return rows
+
+
+def print_report(rows):
+    print(f"{'backend':<10} {'param':>7} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8} {'B/vector':>9}")
+    for row in rows:
+        param = '' if row['param'] is None else row['param']
+        print(f"{row['backend']:<10} {param:>7} {row['recall']:>7.3f} {row['p50_ms']:>8.2f} "
+              f"{row['p95_ms']:>8.2f} {row['build_s']:>8.1f} {row['bytes_per_vector']:>9.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recall, latency and memory of ANN backends and compressed "
+                                                 "storage against the exact flat index")
+    parser.add_argument('--index', default='vector_store/index.faiss', help="persisted index to evaluate")
+    parser.add_argument('--synthetic', type=int, default=0, help="use N random unit vectors instead")
+    parser.add_argument('--dimension', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        data = np.random.default_rng(0).standard_normal((args.synthetic, args.dimension)).astype('float32')
+        faiss.normalize_L2(data)
+    else:
+        _, data = extract_vectors(faiss.read_index(args.index))
+    print_report(recall_report(data, n_queries=args.queries, top_k=args.top_k))
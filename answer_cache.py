@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import answer_cache_enabled, answer_cache_max_entries, answer_cache_similarity, answer_cache_ttl
+
+
+class AnswerCache:
+    """In-memory cache of generated answers for repeated questions.
+
+    An answer is reused when a new question embeds within `similarity` (cosine) of a
+    cached one, retrieval returned exactly the same chunk IDs and the same chat model
+    is asked. Entries expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_entries`. Entries are dropped as soon as any source document
+    they were answered from is removed from or re-added to the vector store.
+    """
+
+    def __init__(self, max_entries=answer_cache_max_entries, ttl=answer_cache_ttl,
+                 similarity=answer_cache_similarity):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry ID -> entry, least recently used first
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry['created'] > self.ttl]
+        for entry_id in expired:
+            del self._entries[entry_id]
+
+    def get(self, query_embedding, chunk_ids, model_name):
+        """Return the cached answer for a near-identical question over the same context, or None"""
+        query = self._normalize(query_embedding)
+        key = (model_name, frozenset(chunk_ids))
+        with self._lock:
+            self._expire(time.time())
+            best_id, best_score = None, self.similarity
+            for entry_id, entry in self._entries.items():
+                if entry['key'] != key:
+                    continue
+                score = float(entry['query'] @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id]['answer']
+
+    def put(self, query_embedding, chunk_ids, sources, model_name, answer):
+        with self._lock:
+            self._entries[self._next_id] = {
+                'key': (model_name, frozenset(chunk_ids)),
+                'query': self._normalize(query_embedding),
+                'sources': frozenset(sources),
+                'answer': answer,
+                'created': time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_sources(self, sources=None):
+        """Drop answers built from any of `sources`; None drops everything"""
+        with self._lock:
+            if sources is None:
+                self._entries.clear()
+                return
+            sources = set(sources)
+            stale = [entry_id for entry_id, entry in self._entries.items() if entry['sources'] & sources]
+            for entry_id in stale:
+                del self._entries[entry_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache(store):
+    """Process-wide answer cache kept in sync with `store`, or None when caching is disabled"""
+    global _cache
+    if not answer_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache = AnswerCache()
+                store.subscribe(cache.invalidate_sources)
+                _cache = cache
+    return _cache
@@ -0,0 +1,100 @@
+"""Sentences-per-second of the old per-sentence chunking loop vs. the Chunker engine.
+
+Run from the repository root:  python benchmarks/bench_chunker.py [pdf or directory ...]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nltk
+import tiktoken
+from pdfminer.high_level import extract_text
+
+from chunker import Chunker
+
+
+def legacy_num_tokens(string):
+    # The previous num_tokens_from_string: looked up the encoding on every call
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return len(encoding.encode(string))
+
+
+def legacy_chunks(texts):
+    """The chunking loop formerly inlined in add_documents_to_vector_store"""
+    chunks = []
+    sentence_count = 0
+    for text in texts:
+        sentences = nltk.sent_tokenize(text)
+        sentence_count += len(sentences)
+        current_chunk = ""
+        current_tokens = 0
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if not sentence.endswith('.'):
+                sentence += '.'
+            sentence_tokens = legacy_num_tokens(sentence)
+            if current_tokens + sentence_tokens <= 500:
+                current_chunk = current_chunk + " " + sentence if current_chunk else sentence
+                current_tokens += sentence_tokens
+                if current_tokens >= 200:
+                    chunks.append(current_chunk)
+                    current_chunk = ""
+                    current_tokens = 0
+            else:
+                if current_chunk.strip():
+                    chunks.append(current_chunk)
+                current_chunk = sentence
+                current_tokens = sentence_tokens
+        if current_chunk.strip():
+            chunks.append(current_chunk)
+    return chunks, sentence_count
+
+
+def engine_chunks(texts):
+    chunker = Chunker()
+    chunks = list(chunker.chunks(texts))
+    return chunks, chunker.sentence_count
+
+
+def pdf_paths(targets):
+    for target in targets:
+        if os.path.isdir(target):
+            yield from sorted(glob.glob(os.path.join(target, '**', '*.pdf'), recursive=True))
+        else:
+            yield target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['myFiles'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [extract_text(path) for path in pdf_paths(args.paths)]
+    print(f"Loaded {len(texts)} PDFs, {sum(len(t) for t in texts):,} characters")
+
+    # Warm up the encoders and punkt so neither side pays one-off loading costs
+    legacy_chunks(texts[:1])
+    engine_chunks(texts[:1])
+
+    results = {}
+    for name, fn in (('legacy', legacy_chunks), ('engine', engine_chunks)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            chunks, sentences = fn(texts)
+            best = min(best, time.perf_counter() - start)
+        results[name] = (sentences / best, len(chunks))
+        print(f"{name:<7} {sentences:>7} sentences  {len(chunks):>5} chunks  {sentences / best:>10,.0f} sentences/s")
+
+    print(f"speedup: {results['engine'][0] / results['legacy'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
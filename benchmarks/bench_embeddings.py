@@ -0,0 +1,104 @@
+"""Throughput and retrieval agreement of the ONNX embedding backends against PyTorch.
+
+Run from the repository root:  python benchmarks/bench_embeddings.py [pdf or directory ...]
+Chunks of the given PDFs are the corpus; the first sentence of a sample of chunks are the queries.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+from chunker import Chunker, sent_tokenize
+from config import embedding_model
+from embedding_backends import BACKENDS, load_embedder
+from pdf_handler import Handle_pdf
+
+
+def pdf_paths(targets):
+    for target in targets:
+        if os.path.isdir(target):
+            yield from sorted(glob.glob(os.path.join(target, '**', '*.pdf'), recursive=True))
+        else:
+            yield target
+
+
+def timed_encode(model, texts, batch_size):
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(texts, batch_size=batch_size), dtype='float32')
+    return embeddings, time.perf_counter() - start
+
+
+def top_k(corpus, queries, k):
+    index = faiss.IndexFlatIP(corpus.shape[1])
+    index.add(corpus)
+    return index.search(queries, k)[1]
+
+
+def overlap(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['myFiles'])
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS[1:], default=list(BACKENDS[1:]))
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    chunker = Chunker()
+    corpus_texts = [chunk for path in pdf_paths(args.paths)
+                    for chunk in chunker.chunks(text for _, text in Handle_pdf(path).read_pages(ocr=False))]
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(corpus_texts), min(args.queries, len(corpus_texts)), replace=False)
+    query_texts = [(sent_tokenize(corpus_texts[i]) or [corpus_texts[i]])[0] for i in sample]
+    k = min(args.top_k, len(corpus_texts))
+    print(f"{len(corpus_texts)} chunks, {len(query_texts)} queries, model {embedding_model}")
+
+    rows = []
+    baseline = None
+    for backend in ('torch',) + tuple(args.backends):
+        start = time.perf_counter()
+        model = load_embedder(embedding_model, backend)
+        load_s = time.perf_counter() - start
+        model.encode(query_texts[:2])  # warm up
+        corpus, corpus_s = timed_encode(model, corpus_texts, args.batch_size)
+        latencies = []
+        for text in query_texts:
+            start = time.perf_counter()
+            model.encode([text])
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries, _ = timed_encode(model, query_texts, args.batch_size)
+
+        row = {'backend': backend, 'load_s': load_s, 'chunks_per_s': len(corpus_texts) / corpus_s,
+               'query_p50_ms': float(np.percentile(latencies, 50))}
+        if baseline is None:
+            baseline = (corpus, queries, top_k(corpus, queries, k))
+            row.update(cosine_mean=1.0, cosine_min=1.0, recall_old_index=1.0, recall_new_index=1.0)
+        else:
+            base_corpus, base_queries, truth = baseline
+            cosine = np.sum(corpus * base_corpus, axis=1) / (
+                np.linalg.norm(corpus, axis=1) * np.linalg.norm(base_corpus, axis=1))
+            row.update(cosine_mean=float(cosine.mean()), cosine_min=float(cosine.min()),
+                       # New queries against the existing PyTorch-built index, and a fully re-embedded index
+                       recall_old_index=overlap(top_k(base_corpus, queries, k), truth),
+                       recall_new_index=overlap(top_k(corpus, queries, k), truth))
+        rows.append(row)
+
+    print(f"{'backend':<10} {'load s':>7} {'chunks/s':>9} {'query ms':>9} {'cos mean':>9} {'cos min':>8} "
+          f"{'R@k old':>8} {'R@k new':>8}")
+    for row in rows:
+        print(f"{row['backend']:<10} {row['load_s']:>7.1f} {row['chunks_per_s']:>9.1f} {row['query_p50_ms']:>9.1f} "
+              f"{row['cosine_mean']:>9.4f} {row['cosine_min']:>8.4f} {row['recall_old_index']:>8.3f} "
+              f"{row['recall_new_index']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
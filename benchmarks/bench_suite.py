@@ -0,0 +1,241 @@
+"""Reproducible offline benchmark of ingestion and retrieval, saved as JSON for comparing runs.
+
+Run from the repository root:  python benchmarks/bench_suite.py [pdf or directory ...]
+Stages: PDF extraction (pages/s), chunking (chunks/s), embedding (embeddings/s, query latency)
+on the given PDFs, then index add and dense/BM25/hybrid query latency on synthetic corpora
+(--scales 10000 100000 1000000). Each stage runs in a fresh process so its peak RSS is its own.
+Compare two runs with --compare old.json.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+
+def pdf_paths(targets):
+    for target in targets:
+        if os.path.isdir(target):
+            yield from sorted(glob.glob(os.path.join(target, '**', '*.pdf'), recursive=True))
+        else:
+            yield target
+
+
+def percentiles(latencies):
+    """p50/p95/p99 of a list of seconds, in milliseconds"""
+    values = np.asarray(latencies) * 1000
+    return {f'p{q}_ms': round(float(np.percentile(values, q)), 3) for q in (50, 95, 99)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def bench_extraction(paths, ocr):
+    from pdf_handler import Handle_pdf
+
+    start = time.perf_counter()
+    pages = [text for path in paths for _, text in Handle_pdf(path).read_pages(ocr=ocr)]
+    seconds = time.perf_counter() - start
+    return {'files': len(paths), 'pages': len(pages), 'characters': sum(map(len, pages)), 'seconds': seconds,
+            'pages_per_s': len(pages) / seconds}, pages
+
+
+def bench_chunking(pages):
+    from chunker import Chunker
+
+    Chunker().chunk_text(pages[0] if pages else "Warm up.")  # load punkt and the token encoding
+    chunker = Chunker()
+    start = time.perf_counter()
+    chunks = list(chunker.chunks(pages))
+    seconds = time.perf_counter() - start
+    return {'chunks': len(chunks), 'sentences': chunker.sentence_count, 'seconds': seconds,
+            'chunks_per_s': len(chunks) / seconds, 'sentences_per_s': chunker.sentence_count / seconds}, chunks
+
+
+def bench_embedding(chunks, queries):
+    from config import embedding_backend, embedding_batch_size, embedding_model
+    from embedding_backends import load_embedder
+
+    start = time.perf_counter()
+    model = load_embedder(embedding_model, embedding_backend)
+    load_seconds = time.perf_counter() - start
+    model.encode(chunks[:2])
+    start = time.perf_counter()
+    model.encode(chunks, batch_size=embedding_batch_size)
+    seconds = time.perf_counter() - start
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode([query])
+        latencies.append(time.perf_counter() - start)
+    return {'model': embedding_model, 'backend': embedding_backend, 'load_s': load_seconds,
+            'chunks': len(chunks), 'seconds': seconds, 'embeddings_per_s': len(chunks) / seconds,
+            'dimension': model.get_sentence_embedding_dimension(),
+            'query_embedding': percentiles(latencies)}, None
+
+
+def synthetic_corpus(n, dimension, rng, words_per_chunk=40, vocabulary=50000, clusters=256):
+    """Clustered unit vectors and Zipf-distributed word texts, generated in batches"""
+    centers = rng.standard_normal((clusters, dimension)).astype('float32')
+    for start in range(0, n, 10000):
+        size = min(10000, n - start)
+        noise = rng.standard_normal((size, dimension)).astype('float32')
+        vectors = centers[rng.integers(0, clusters, size)] + 0.5 * noise
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        words = np.minimum(rng.zipf(1.2, (size, words_per_chunk)), vocabulary)
+        yield vectors, [' '.join(f'w{word}' for word in row) for row in words]
+
+
+def bench_retrieval(n, dimension, queries, top_k, seed):
+    from lexical_index import fuse_rankings
+    from store import VectorStore
+
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = VectorStore(directory=directory)
+        sample_vectors, sample_texts = [], []
+        start = time.perf_counter()
+        for batch, (vectors, texts) in enumerate(synthetic_corpus(n, dimension, rng)):
+            store.add(vectors, texts, f'synthetic-{batch}')
+            sample_vectors.append(vectors[:queries])
+            sample_texts.extend(texts[:queries])
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        store.save()
+        save_seconds = time.perf_counter() - start
+
+        # Queries near stored chunks, and the first few words of stored texts
+        picks = rng.choice(len(sample_texts), queries, replace=len(sample_texts) < queries)
+        query_vectors = np.vstack(sample_vectors)[picks]
+        query_vectors = query_vectors + 0.1 * rng.standard_normal(query_vectors.shape).astype('float32')
+        query_texts = [' '.join(sample_texts[i].split()[:4]) for i in picks]
+        latencies = {'dense': [], 'lexical': [], 'hybrid': []}
+        store.search(query_vectors[:1], top_k)
+        for vector, text in zip(query_vectors, query_texts):
+            start = time.perf_counter()
+            store.search(vector[None, :], top_k)
+            latencies['dense'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            store.lexical_search(text, top_k)
+            latencies['lexical'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            fuse_rankings(store.search(vector[None, :], top_k), store.lexical_search(text, top_k))
+            latencies['hybrid'].append(time.perf_counter() - start)
+        return {'chunks': n, 'dimension': dimension, 'backend': store.backend, 'storage': store.storage,
+                'build_s': build_seconds, 'index_add_chunks_per_s': n / build_seconds, 'save_s': save_seconds,
+                'index_mib': store.memory_bytes() / 2 ** 20,
+                **{f'{kind}_query': percentiles(values) for kind, values in latencies.items()}}, None
+
+
+def _measured(function, args):
+    result, output = function(*args)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result, output
+
+
+def run_isolated(function, *args):
+    """Run a stage in a fresh process; returns (result dict, output), with the error recorded on failure"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        try:
+            return pool.submit(_measured, function, args).result()
+        except Exception as e:
+            # Keep the first informative line; NLTK and friends wrap theirs in banners
+            message = next((line.strip() for line in str(e).splitlines() if any(c.isalpha() for c in line)), '')
+            return {'error': f"{type(e).__name__}: {message}"}, None
+
+
+def environment():
+    import config
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'config': {name: getattr(config, name) for name in (
+                'embedding_model', 'embedding_backend', 'index_backend', 'ann_backend', 'vector_storage',
+                'retrieval_mode', 'chunk_max_tokens', 'chunk_min_tokens')}}
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def compare(old_path, new):
+    with open(old_path) as f:
+        old = flatten(json.load(f)['stages'])
+    new = flatten(new['stages'])
+    print(f"\n{'metric':<48} {'old':>12} {'new':>12} {'new/old':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        if old[key]:
+            print(f"{key:<48} {old[key]:>12.2f} {new[key]:>12.2f} {new[key] / old[key]:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['myFiles'])
+    parser.add_argument('--ocr', action='store_true', help="OCR pages without a text layer")
+    parser.add_argument('--scales', type=int, nargs='*', default=[10000, 100000],
+                        help="synthetic corpus sizes in chunks (e.g. 10000 100000 1000000)")
+    parser.add_argument('--dimension', type=int, default=768, help="synthetic vector dimension")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=8)
+    parser.add_argument('--skip-embedding', action='store_true', help="do not load the embedding model")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    stages = {}
+    paths = list(pdf_paths(args.paths))
+    stages['extraction'], pages = run_isolated(bench_extraction, paths, args.ocr)
+    print(f"extraction  {stages['extraction']}")
+    chunks = None
+    if pages:
+        stages['chunking'], chunks = run_isolated(bench_chunking, pages)
+        print(f"chunking    {stages['chunking']}")
+    if not args.skip_embedding:
+        rng = np.random.default_rng(args.seed)
+        texts = chunks or [text for _, batch in synthetic_corpus(1000, 8, rng) for text in batch]
+        queries = [' '.join(text.split()[:12]) for text in rng.choice(texts, min(args.queries, len(texts)))]
+        stages['embedding'], _ = run_isolated(bench_embedding, texts, queries)
+        print(f"embedding   {stages['embedding']}")
+    for n in args.scales:
+        stages[f'retrieval_{n}'], _ = run_isolated(bench_retrieval, n, args.dimension, args.queries, args.top_k,
+                                                  args.seed)
+        print(f"retrieval   {stages[f'retrieval_{n}']}")
+
+    results = {'environment': environment(), 'stages': stages}
+    output = args.output or os.path.join('benchmarks', 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
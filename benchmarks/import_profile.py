@@ -0,0 +1,50 @@
+"""Import-time profile of the app's entry modules, from `python -X importtime`.
+
+Run from the repository root:  python benchmarks/import_profile.py [module ...]
+Each module is imported in a fresh interpreter; the slowest imports are listed by cumulative time.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ['utils', 'ingest', 'Pages_.chatbot', 'Pages_.vector_manager', 'pdf_handler', 'models']
+
+
+def profile(module):
+    """Return (wall seconds, [(cumulative µs, self µs, module name)]) for importing `module`"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return seconds, rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Where import time goes for the app's modules")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            seconds, rows = profile(module)
+        except RuntimeError as e:
+            print(f"{module}: failed to import ({e})\n")
+            continue
+        heavy = [row for row in rows if row[2].strip() not in ('', module)]
+        print(f"{module}: {seconds:.2f}s wall, {len(rows)} modules imported")
+        print(f"  {'cumulative ms':>14} {'self ms':>8}  module")
+        for cumulative_us, self_us, name in sorted(heavy, reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name.strip()}")
+        print()
@@ -0,0 +1,100 @@
+"""Minimal OpenAI-compatible chat completions server for measuring streaming latency offline.
+
+Run from the repository root:  python benchmarks/openai_stub_server.py --port 8001 --token-delay 0.02
+then start the app with OPENAI_BASE_URL=http://127.0.0.1:8001/v1 (any OPEN_AI_KEY works).
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = ("Based on the uploaded documents, this is a canned answer from the local stub server. "
+          "It streams one word at a time so that time to first token and total latency can be "
+          "measured without calling the real API.")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    first_token_delay = 0.3
+    token_delay = 0.02
+    rate_limit_every = 0
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        StubHandler.requests += 1
+        if self.rate_limit_every and StubHandler.requests % self.rate_limit_every == 0:
+            body = b'{"error": {"message": "Rate limit reached", "type": "requests"}}'
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        model = request.get('model', 'stub')
+        words = ANSWER.split(' ')
+        created = int(time.time())
+
+        time.sleep(self.first_token_delay)
+        if not request.get('stream'):
+            time.sleep(self.token_delay * len(words))
+            body = json.dumps({
+                'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ANSWER}}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)},
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # No content length for an event stream, so end it by closing the connection
+        self.send_header('Connection', 'close')
+        self.close_connection = True
+        self.end_headers()
+        for i, word in enumerate(words):
+            delta = {'content': word if i == 0 else ' ' + word}
+            if i == 0:
+                delta['role'] = 'assistant'
+            self._event({'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': created,
+                         'model': model, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})
+            time.sleep(self.token_delay)
+        self._event({'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': created,
+                     'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def _event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve canned OpenAI chat completions, streamed or not")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--first-token-delay', type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument('--token-delay', type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="answer every Nth request with a 429")
+    args = parser.parse_args()
+
+    StubHandler.first_token_delay = args.first_token_delay
+    StubHandler.token_delay = args.token_delay
+    StubHandler.rate_limit_every = args.rate_limit_every
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub OpenAI server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
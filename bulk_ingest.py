@@ -0,0 +1,136 @@
+"""Ingest every PDF under one or more directories into the persistent vector store, without the UI.
+
+Run from the repository root:  python bulk_ingest.py myFiles [more directories ...]
+
+A manifest of file hashes makes reruns process only new or changed files. The store and
+the manifest are saved after every batch, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+from config import ingest_manifest_path
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path=ingest_manifest_path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=ingest_manifest_path):
+    """Atomically write the manifest next to the store"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def discover(roots):
+    """Yield (source name, path) for every PDF under the given directories or files.
+
+    The source name is the path relative to the directory it was found in, e.g.
+    'knowledge_base1/report.pdf' for myFiles/knowledge_base1/report.pdf.
+    """
+    for root in roots:
+        if os.path.isfile(root):
+            yield os.path.basename(root), root
+            continue
+        for path in sorted(glob.glob(os.path.join(root, '**', '*.pdf'), recursive=True)):
+            yield os.path.relpath(path, root).replace(os.sep, '/'), path
+
+
+def plan(files, manifest):
+    """Split discovered files into (to ingest, unchanged), refreshing stat info of unchanged files"""
+    pending, unchanged = [], []
+    for source, path in files:
+        stat = os.stat(path)
+        entry = manifest.get(source)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            unchanged.append(source)
+            continue
+        sha256 = file_sha256(path)
+        if entry and entry['sha256'] == sha256:
+            # Touched but not modified
+            entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            unchanged.append(source)
+            continue
+        pending.append((source, path, sha256, stat))
+    return pending, unchanged
+
+
+def print_progress(source, stage, detail=""):
+    print(f"  {stage:<8} {source}  {detail}", flush=True)
+
+
+def run(roots, batch_size=16, prune=False, manifest_path=ingest_manifest_path, store=None):
+    """Ingest new and changed PDFs into `store` (default: the shared store); returns the number of files that failed"""
+    from ingest import ingest_files
+    from utils import get_store
+
+    manifest = load_manifest(manifest_path)
+    files = list(discover(roots))
+    pending, unchanged = plan(files, manifest)
+    print(f"📁 {len(files)} PDFs found: {len(pending)} new or changed, {len(unchanged)} unchanged")
+
+    if store is None:
+        store = get_store()
+    if prune:
+        present = {source for source, _ in files}
+        for source in [source for source in manifest if source not in present]:
+            store.remove_source(source)
+            del manifest[source]
+            print(f"  removed  {source}  (no longer on disk)")
+        store.save()
+        save_manifest(manifest, manifest_path)
+
+    failed = 0
+    start = time.perf_counter()
+    for offset in range(0, len(pending), batch_size):
+        batch = pending[offset:offset + batch_size]
+        # Changed files, and files a crashed run indexed without recording them, are replaced wholesale
+        for source, _, _, _ in batch:
+            if store.has_source(source):
+                store.remove_source(source)
+        added = ingest_files([(source, path) for source, path, _, _ in batch], print_progress, store=store)
+        for source, path, sha256, stat in batch:
+            if source not in added:
+                failed += 1
+                manifest.pop(source, None)
+                continue
+            manifest[source] = {'sha256': sha256, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                                'chunks': added[source], 'ingested_at': time.time()}
+        # ingest_files saved the store; record the batch only now, so a crash never marks unindexed files done
+        save_manifest(manifest, manifest_path)
+        done = min(offset + batch_size, len(pending))
+        print(f"✅ {done}/{len(pending)} files processed in {time.perf_counter() - start:.0f}s, "
+              f"{store.ntotal} chunks in store", flush=True)
+    return failed
+
+
+if __name__ == '__main__':
+    # Guarded: the ingestion process pool starts workers with spawn, which re-imports this module
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['myFiles'], help="directories or PDF files")
+    parser.add_argument('--batch-size', type=int, default=16, help="files per checkpoint")
+    parser.add_argument('--prune', action='store_true', help="remove documents whose file no longer exists")
+    parser.add_argument('--manifest', default=ingest_manifest_path)
+    args = parser.parse_args()
+
+    sys.exit(1 if run(args.paths, args.batch_size, args.prune, args.manifest) else 0)
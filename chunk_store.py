@@ -0,0 +1,284 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from config import chunk_text_compression, chunk_store_mmap_bytes
+
+PLAIN, ZSTD = 0, 1
+
+
+def _zstd():
+    """The zstandard module, or None when it is not installed"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+class ChunkStore:
+    """Chunk texts and metadata of a vector store in SQLite, addressed by chunk ID.
+
+    Source names are interned into a table of their own, so each chunk row holds
+    a small integer; chunk text is optionally zstd-compressed. The BM25 postings of
+    `lexical_index.BM25Index` live in the same file. Writes stay in an open
+    transaction until `commit`, which `VectorStore.save` calls when it writes the
+    index, so the two are persisted together.
+    """
+
+    def __init__(self, path, compression=chunk_text_compression):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        if chunk_store_mmap_bytes:
+            self._conn.execute(f'PRAGMA mmap_size={int(chunk_store_mmap_bytes)}')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+            CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, source_id INTEGER NOT NULL,
+                                               page INTEGER, codec INTEGER NOT NULL, text BLOB NOT NULL);
+            CREATE INDEX IF NOT EXISTS chunks_by_source ON chunks (source_id);
+            CREATE TABLE IF NOT EXISTS links (chunk_id INTEGER NOT NULL, source_id INTEGER NOT NULL, page INTEGER);
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (term_id INTEGER NOT NULL, chunk_id INTEGER NOT NULL,
+                                                 tf INTEGER NOT NULL, length INTEGER NOT NULL,
+                                                 PRIMARY KEY (term_id, chunk_id)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS chunk_lengths (chunk_id INTEGER PRIMARY KEY, length INTEGER NOT NULL);
+        ''')
+        self._conn.commit()
+        self._source_ids = dict(self._conn.execute('SELECT name, id FROM sources'))
+        self._source_names = {source_id: sys.intern(name) for name, source_id in self._source_ids.items()}
+
+        self._compressor = self._decompressor = None
+        zstandard = _zstd()
+        if compression == 'zstd':
+            if zstandard is None:
+                print("⚠️ chunk_text_compression = 'zstd' needs the zstandard package; storing chunk text uncompressed")
+            else:
+                self._compressor = zstandard.ZstdCompressor(level=3)
+        if zstandard is not None:
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def _encode(self, text):
+        data = text.encode('utf-8')
+        if self._compressor is not None:
+            compressed = self._compressor.compress(data)
+            if len(compressed) < len(data):
+                return ZSTD, compressed
+        return PLAIN, data
+
+    def _decode(self, codec, data):
+        if codec == ZSTD:
+            if self._decompressor is None:
+                raise RuntimeError("Chunk text in the store is zstd-compressed; install the zstandard package")
+            data = self._decompressor.decompress(data)
+        return bytes(data).decode('utf-8')
+
+    def _source_id(self, name):
+        source_id = self._source_ids.get(name)
+        if source_id is None:
+            source_id = self._conn.execute('INSERT INTO sources (name) VALUES (?)', (name,)).lastrowid
+            self._source_ids[name] = source_id
+            self._source_names[source_id] = sys.intern(name)
+        return source_id
+
+    def intern(self, name):
+        """The shared copy of a source name, so in-memory metadata holds one string per document"""
+        with self._lock:
+            return self._source_names[self._source_id(name)]
+
+    def add(self, rows):
+        """Append (chunk ID, text, source, page) rows"""
+        with self._lock:
+            self._conn.executemany('INSERT INTO chunks VALUES (?, ?, ?, ?, ?)',
+                                   [(chunk_id, self._source_id(source), page) + self._encode(text)
+                                    for chunk_id, text, source, page in rows])
+
+    def texts(self, chunk_ids):
+        """{chunk ID: text} for the given IDs"""
+        found = {}
+        unique = list(dict.fromkeys(chunk_ids))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                for chunk_id, codec, data in self._conn.execute(
+                        f'SELECT id, codec, text FROM chunks WHERE id IN ({placeholders})', batch):
+                    found[chunk_id] = self._decode(codec, data)
+        return found
+
+    def rows(self, page_size=2000):
+        """Every (chunk ID, text, source, page) in ID order, read a page of rows at a time"""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute('SELECT id, codec, text, source_id, page FROM chunks WHERE id > ? '
+                                          'ORDER BY id LIMIT ?', (last, page_size)).fetchall()
+            if not rows:
+                return
+            for chunk_id, codec, data, source_id, page in rows:
+                yield chunk_id, self._decode(codec, data), self._source_names[source_id], page
+            last = rows[-1][0]
+
+    def metadata(self, page_size=20000):
+        """Every (chunk ID, source, page) in ID order, without reading chunk text"""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute('SELECT id, source_id, page FROM chunks WHERE id > ? ORDER BY id LIMIT ?',
+                                          (last, page_size)).fetchall()
+            if not rows:
+                return
+            for chunk_id, source_id, page in rows:
+                yield chunk_id, self._source_names[source_id], page
+            last = rows[-1][0]
+
+    def unindexed_rows(self, page_size=2000):
+        """(chunk ID, text) of the chunks without BM25 postings, e.g. in a store written before they were kept"""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute('SELECT id, codec, text FROM chunks WHERE id > ? AND id NOT IN '
+                                          '(SELECT chunk_id FROM chunk_lengths) ORDER BY id LIMIT ?',
+                                          (last, page_size)).fetchall()
+            if not rows:
+                return
+            for chunk_id, codec, data in rows:
+                yield chunk_id, self._decode(codec, data)
+            last = rows[-1][0]
+
+    def _term_ids(self, terms, create=False):
+        if create:
+            self._conn.executemany('INSERT OR IGNORE INTO terms (term) VALUES (?)', [(term,) for term in terms])
+        ids = {}
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            ids.update(self._conn.execute(f'SELECT term, id FROM terms WHERE term IN ({placeholders})', batch))
+        return ids
+
+    def add_postings(self, entries):
+        """Index [(chunk ID, {term: frequency})] for BM25"""
+        with self._lock:
+            term_ids = self._term_ids(list({term for _, counts in entries for term in counts}), create=True)
+            rows, lengths = [], []
+            for chunk_id, counts in entries:
+                length = sum(counts.values())
+                lengths.append((chunk_id, length))
+                rows.extend((term_ids[term], chunk_id, tf, length) for term, tf in counts.items())
+            self._conn.executemany('INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?)', rows)
+            self._conn.executemany('INSERT OR REPLACE INTO chunk_lengths VALUES (?, ?)', lengths)
+
+    def remove_postings(self, entries):
+        """Drop the postings of [(chunk ID, its terms)]; returns (chunks removed, their total length)"""
+        with self._lock:
+            lengths = {}
+            chunk_ids = [chunk_id for chunk_id, _ in entries]
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                lengths.update(self._conn.execute(
+                    f'SELECT chunk_id, length FROM chunk_lengths WHERE chunk_id IN ({placeholders})', batch))
+            entries = [(chunk_id, terms) for chunk_id, terms in entries if chunk_id in lengths]
+            term_ids = self._term_ids(list({term for _, terms in entries for term in terms}))
+            self._conn.executemany('DELETE FROM postings WHERE term_id = ? AND chunk_id = ?',
+                                   [(term_ids[term], chunk_id) for chunk_id, terms in entries
+                                    for term in terms if term in term_ids])
+            self._conn.executemany('DELETE FROM chunk_lengths WHERE chunk_id = ?',
+                                   [(chunk_id,) for chunk_id, _ in entries])
+            return len(entries), sum(lengths[chunk_id] for chunk_id, _ in entries)
+
+    def postings(self, terms):
+        """{term: [(chunk ID, term frequency, chunk length)]} for the given terms that occur anywhere"""
+        terms = list(terms)
+        found = {}
+        with self._lock:
+            term_ids = self._term_ids(terms)
+            for term, term_id in term_ids.items():
+                rows = self._conn.execute('SELECT chunk_id, tf, length FROM postings WHERE term_id = ?',
+                                          (term_id,)).fetchall()
+                if rows:
+                    found[term] = rows
+        return found
+
+    def lexical_totals(self):
+        """(number of indexed chunks, their total length in terms)"""
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), SUM(length) FROM chunk_lengths').fetchone()
+        return count, total or 0
+
+    def reassign(self, chunk_id, source, page):
+        with self._lock:
+            self._conn.execute('UPDATE chunks SET source_id = ?, page = ? WHERE id = ?',
+                               (self._source_id(source), page, chunk_id))
+
+    def remove(self, chunk_ids):
+        with self._lock:
+            self._conn.executemany('DELETE FROM chunks WHERE id = ?', [(chunk_id,) for chunk_id in chunk_ids])
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM chunks').fetchone()[0]
+
+    def links(self):
+        """{chunk ID: [(source, page)]} of near-duplicates linked to stored chunks"""
+        links = {}
+        with self._lock:
+            for chunk_id, source_id, page in self._conn.execute('SELECT chunk_id, source_id, page FROM links'):
+                links.setdefault(chunk_id, []).append((self._source_names[source_id], page))
+        return links
+
+    def add_links(self, occurrences):
+        """Append [(chunk ID, source, page)] near-duplicate links"""
+        with self._lock:
+            self._conn.executemany('INSERT INTO links VALUES (?, ?, ?)',
+                                   [(chunk_id, self._source_id(source), page) for chunk_id, source, page in occurrences])
+
+    def unlink(self, chunk_id=None, source=None):
+        """Delete the links to a chunk, of a source, or of a source to one chunk"""
+        clauses, params = [], []
+        with self._lock:
+            if source is not None:
+                if source not in self._source_ids:
+                    return
+                clauses.append('source_id = ?')
+                params.append(self._source_ids[source])
+            if chunk_id is not None:
+                clauses.append('chunk_id = ?')
+                params.append(chunk_id)
+            self._conn.execute(f'DELETE FROM links WHERE {" AND ".join(clauses)}', params)
+
+    def set_links(self, links):
+        with self._lock:
+            self._conn.execute('DELETE FROM links')
+            self._conn.executemany('INSERT INTO links VALUES (?, ?, ?)',
+                                   [(chunk_id, self._source_id(source), page)
+                                    for chunk_id, occurrences in links.items() for source, page in occurrences])
+
+    def get_setting(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_setting(self, key, value):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO settings VALUES (?, ?)', (key, json.dumps(value)))
+
+    def clear(self):
+        with self._lock:
+            for table in ('chunks', 'links', 'sources', 'settings', 'terms', 'postings', 'chunk_lengths'):
+                self._conn.execute(f'DELETE FROM {table}')
+            self._source_ids = {}
+            self._source_names = {}
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
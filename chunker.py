@@ -0,0 +1,150 @@
+from functools import lru_cache
+
+from config import chunk_max_tokens, chunk_min_tokens, chunk_overlap_tokens, chunk_token_model
+
+MODEL_ENCODINGS = {
+    'gpt-4o-mini': (0.00015, "o200k_base"),
+    'gpt-3.5-turbo': (0.002, "cl100k_base"),
+    'gpt-3.5-turbo-16k': (0.004, "cl100k_base"),
+    'text-davinci-003': (0.02, "p50k_base"),
+}
+
+
+def price_and_encoding(model_used):
+    return MODEL_ENCODINGS.get(model_used, (0.02, "p50k_base"))
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name):
+    """Load a tiktoken encoding once per process, falling back to cl100k_base when tiktoken lacks it"""
+    import tiktoken
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except ValueError:
+        # e.g. o200k_base needs tiktoken >= 0.7; cl100k_base counts within a few percent of it
+        print(f"⚠️ tiktoken has no '{encoding_name}' encoding; counting tokens with cl100k_base")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=None)
+def _sentence_tokenizer():
+    # nltk is slow to import and may need to download `punkt`; defer both until text is split
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt', quiet=True)
+    return nltk.sent_tokenize
+
+
+def sent_tokenize(text):
+    """Split text into sentences with nltk's punkt tokenizer"""
+    return _sentence_tokenizer()(text)
+
+
+def count_tokens_batch(strings, model_used=chunk_token_model):
+    """Token counts for many strings in one tiktoken call"""
+    _, encoding_name = price_and_encoding(model_used)
+    encoding = get_encoding(encoding_name)
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(strings))]
+
+
+class Chunker:
+    """Sentence-packing chunker that streams chunks from an iterable of text sections.
+
+    Sentences are packed into a chunk until it holds at least `min_tokens`, and a chunk
+    never grows past `max_tokens` (a single longer sentence becomes its own chunk).
+    With `overlap_tokens`, trailing sentences of each chunk are repeated at the start
+    of the next one. Sections (e.g. pages) are chunked independently.
+    """
+
+    def __init__(self, max_tokens=chunk_max_tokens, min_tokens=chunk_min_tokens,
+                 overlap_tokens=chunk_overlap_tokens, model_used=chunk_token_model):
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.overlap_tokens = overlap_tokens
+        self.model_used = model_used
+        self.sentence_count = 0
+
+    def sentences(self, text):
+        for sentence in sent_tokenize(text):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            # Add period back if it was removed
+            if not sentence.endswith('.'):
+                sentence += '.'
+            yield sentence
+
+    def _carry(self, sentences, counts, reserve):
+        """Trailing sentences of a finished chunk to repeat in the next one.
+
+        They must fit the overlap budget and leave `reserve` tokens free under the maximum.
+        """
+        budget = min(self.overlap_tokens, self.max_tokens - reserve)
+        carried, carried_tokens = [], 0
+        for sentence, count in zip(reversed(sentences), reversed(counts)):
+            if carried_tokens + count > budget:
+                break
+            carried.insert(0, (sentence, count))
+            carried_tokens += count
+        # Never carry the whole chunk over, or the next chunk would repeat it
+        if len(carried) == len(sentences):
+            carried = carried[1:]
+        return carried
+
+    def chunk_text(self, text):
+        """Yield chunks for one text section"""
+        sentences = list(self.sentences(text))
+        self.sentence_count += len(sentences)
+        if not sentences:
+            return
+        counts = count_tokens_batch(sentences, self.model_used)
+
+        current, current_counts = [], []
+        fresh = 0  # sentences not yet emitted in any chunk
+        for sentence, tokens in zip(sentences, counts):
+            if sum(current_counts) + tokens <= self.max_tokens:
+                current.append(sentence)
+                current_counts.append(tokens)
+                fresh += 1
+                if sum(current_counts) >= self.min_tokens:
+                    yield " ".join(current)
+                    carried = self._carry(current, current_counts, 0)
+                    current = [s for s, _ in carried]
+                    current_counts = [c for _, c in carried]
+                    fresh = 0
+            else:
+                # Adding this sentence would exceed the maximum; close the current chunk
+                if fresh:
+                    yield " ".join(current)
+                carried = self._carry(current, current_counts, tokens)
+                current = [s for s, _ in carried] + [sentence]
+                current_counts = [c for _, c in carried] + [tokens]
+                fresh = 1
+
+        if fresh:
+            yield " ".join(current)
+
+    def chunks(self, texts):
+        """Yield chunks for an iterable of sections as each section is read"""
+        for text in texts:
+            yield from self.chunk_text(text)
+
+    def page_chunks(self, pages):
+        """Yield (page_number, chunk) for an iterable of (page_number, text)"""
+        for page_number, text in pages:
+            for chunk in self.chunk_text(text):
+                yield page_number, chunk
+
+
+def batched(items, batch_size):
+    """Lists of up to `batch_size` consecutive items from an iterable"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
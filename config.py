@@ -1,4 +1,109 @@
+import os
+
 embedding_model = 'BAAI/bge-base-en'
+embedding_backend = 'torch'  # 'torch' (SentenceTransformer), 'onnx' or 'onnx-int8' (ONNX Runtime, int8 weights)
+onnx_model_dir = 'onnx_models'  # exported ONNX models, created on first use
+onnx_threads = 0  # ONNX Runtime intra-op threads (0 = one per core)
+
+# Persistent vector store shared by all sessions
+vector_store_dir = 'vector_store'
+vector_store_mmap = True
+chunk_text_compression = None  # 'zstd' compresses chunk text in the store's SQLite file (needs zstandard)
+chunk_store_mmap_bytes = 256 * 1024 * 1024  # SQLite memory-maps up to this much of the chunk file
+
+# Knowledge bases: named document groups, each searched in its own index shard (see knowledge_bases.py)
+knowledge_base_dir = 'vector_store/knowledge_bases'
+knowledge_base_labels = {'knowledge_base1': "Group 1 Documents", 'knowledge_base2': "Group 2 Documents"}
+knowledge_base_search_workers = 4  # shards searched in parallel when a query spans several
+
+# Embedding cache keyed by hash of (embedding model, chunk text)
+embedding_cache_enabled = True
+embedding_cache_path = 'vector_store/embedding_cache.sqlite'
+
+# Index backend: 'flat', 'ivf', 'hnsw', 'ivfpq', or 'auto' (exact flat scan until
+# ann_switch_threshold chunks, then retrain as ann_backend)
+index_backend = 'auto'
+ann_backend = 'ivf'
+ann_switch_threshold = 50000
+ivf_nlist = 0  # 0 picks ~4*sqrt(chunks)
+ivf_nprobe = 16
+ivfpq_m = 64  # PQ sub-quantizers; must divide the embedding dimension
+hnsw_m = 32
+hnsw_ef_construction = 80
+hnsw_ef_search = 64
+# How the flat and IVF backends hold vectors: 'float32', 'fp16' (2x smaller), 'int8' (4x) or 'pq' (3072/pq_m x)
+vector_storage = 'float32'
+pq_m = 64  # bytes per vector with 'pq'; must divide the embedding dimension
+rescore_factor = 4  # compressed storage: re-score top_k * this candidates with exact vectors from the embedding cache
+
+# Chunking: sentences are packed until a chunk reaches chunk_min_tokens, never past chunk_max_tokens
+chunk_max_tokens = 500
+chunk_min_tokens = 200
+chunk_overlap_tokens = 0
+chunk_token_model = 'gpt-3.5-turbo'
+embedding_batch_size = 64
+
+# Worker processes for PDF extraction and chunking (0 = one per CPU core)
+ingest_workers = 0
+ingest_manifest_path = 'vector_store/ingest_manifest.json'  # file hashes seen by bulk_ingest.py
+ingest_job_history = 50  # finished upload jobs kept for the sidebar
+ingest_poll_interval = 2  # seconds between sidebar refreshes while uploads are processing (0 = manual refresh)
+
+# Near-duplicate chunks (boilerplate, repeated report templates) are linked to the stored chunk they
+# repeat instead of being embedded and indexed again. MinHash over word shingles finds candidates;
+# from dedup_skip_jaccard up they are dropped unembedded, below it only if embeddings agree to dedup_cosine
+dedup_enabled = True
+dedup_shingle_size = 5  # words per shingle
+dedup_num_perm = 128
+dedup_bands = 16  # LSH bands; candidates start around Jaccard (1 / bands) ** (bands / num_perm)
+dedup_jaccard = 0.8
+dedup_skip_jaccard = 0.95
+dedup_cosine = 0.95
+
+# OCR fallback for pages without a text layer
+ocr_dpi = 200
+ocr_workers = 0  # pages OCRed concurrently per document (0 = one per CPU core)
+ocr_tesseract_threads = 1  # OpenMP threads per tesseract process
+ocr_cache_enabled = True
+ocr_cache_path = 'vector_store/ocr_cache.sqlite'
+
+# Chat completions; point OPENAI_BASE_URL at any OpenAI-compatible server (e.g. benchmarks/openai_stub_server.py)
+openai_base_url = os.environ.get('OPENAI_BASE_URL') or None
+llm_streaming = True
+llm_max_concurrency = 8  # in-flight OpenAI requests across all sessions
+llm_max_retries = 4  # retries on 429, 5xx and connection errors
+llm_backoff_base = 0.5  # seconds; doubles on every retry
+llm_backoff_max = 20
+llm_timeout = 60  # seconds per request (between streamed chunks when streaming)
+llm_connect_timeout = 5
+
+# Retrieval: 'dense' (FAISS only), 'lexical' (BM25 only) or 'hybrid' (both, fused by reciprocal rank)
+retrieval_mode = 'hybrid'
+hybrid_lexical_weight = 1.0  # weight of the BM25 ranking relative to the dense one
+hybrid_rrf_k = 60
+bm25_k1 = 1.2
+bm25_b = 0.75
+
+# Optional cross-encoder rerank of an over-fetched candidate set
+rerank_enabled = False
+rerank_model = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+rerank_candidates = 24  # chunks fetched from the index before reranking
+rerank_latency_budget = 0.5  # seconds; skip reranking when it is expected to take longer
+rerank_batch_size = 32
+rerank_cache_size = 4096  # cached (query, chunk) scores
+
+# Prompt context: retrieve this many chunks, then pack the best into the token budget
+context_candidates = 8
+context_token_budget = 1500
+context_duplicate_threshold = 0.8  # share of a chunk's words already in a kept chunk
+context_min_trim_tokens = 60  # smallest sentence-trimmed fragment worth including
+
+# Reuse answers to near-identical questions over the same retrieved chunks
+answer_cache_enabled = True
+answer_cache_similarity = 0.97  # cosine similarity between question embeddings
+answer_cache_ttl = 3600  # seconds
+answer_cache_max_entries = 512
+
 template_prompt = """
 You will receive one or more documents along with a user's input. Generate an answer for the user's question and follow these instructions:
 1. If no question is asked, respond in a friendly manner.
@@ -10,3 +115,9 @@ Answer: They are .....[¹]
 References:
 [¹] file name
 """
+
+# Observability: latency spans around every pipeline stage (see metrics.py)
+metrics_port = 0  # serve Prometheus /metrics and /metrics.json from the app on this port (0 = off)
+metrics_host = '0.0.0.0'
+metrics_log_path = None  # also append one JSON line per stage observation to this file
+ui_debug_output = True  # stage timings, answer latency and connection stats in the UI
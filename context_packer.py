@@ -0,0 +1,78 @@
+from chunker import count_tokens_batch, sent_tokenize
+from config import context_duplicate_threshold, context_min_trim_tokens, context_token_budget
+
+SEPARATOR = "\n\n"
+
+
+def _words(text):
+    return set(text.lower().split())
+
+
+def _is_near_duplicate(words, kept_words, threshold):
+    """True when most of a chunk's words already appear in one kept chunk"""
+    if not words:
+        return True
+    return any(len(words & other) / len(words) >= threshold for other in kept_words)
+
+
+def pack_context(context, model_used, budget=context_token_budget, duplicate_threshold=context_duplicate_threshold,
+                 min_trim_tokens=context_min_trim_tokens):
+    """Fit retrieved chunks into a prompt token budget.
+
+    Chunks are taken best score first. A chunk is dropped when it mostly repeats one
+    already taken, and sentences that were already included (e.g. chunk overlap) are
+    skipped. The chunk that crosses the budget is cut at a sentence boundary, as long
+    as at least `min_trim_tokens` of it fit. Returns a context dict in the same shape
+    as `find_match`, holding only the packed (possibly trimmed) chunks, with the token
+    count of the joined text under 'tokens'.
+    """
+    packed = {key: [] for key in ('returned_text', 'source', 'score', 'chunk_id', 'page')}
+    packed['query_embedding'] = context.get('query_embedding')
+    packed['tokens'] = 0
+    texts = context.get('returned_text') or []
+    if not texts:
+        return packed
+
+    fields = [context.get(key) or [None] * len(texts) for key in ('source', 'score', 'chunk_id', 'page')]
+    candidates = sorted(zip(texts, *fields), key=lambda row: row[2] if row[2] is not None else 0, reverse=True)
+
+    separator_tokens = count_tokens_batch([SEPARATOR], model_used)[0]
+    seen_sentences = set()
+    kept_words = []
+    used = 0
+    for text, source, score, chunk_id, page in candidates:
+        words = _words(text)
+        if _is_near_duplicate(words, kept_words, duplicate_threshold):
+            continue
+
+        sentences = [s.strip() for s in sent_tokenize(text)]
+        sentences = [s for s in sentences if s and s not in seen_sentences]
+        if not sentences:
+            continue
+        counts = count_tokens_batch(sentences, model_used)
+
+        remaining = budget - used - (separator_tokens if packed['returned_text'] else 0)
+        taken, taken_tokens = [], 0
+        for sentence, count in zip(sentences, counts):
+            # Joining with a space costs at most one extra token per sentence
+            if taken_tokens + count + 1 > remaining:
+                break
+            taken.append(sentence)
+            taken_tokens += count + 1
+        if len(taken) < len(sentences) and taken_tokens < min_trim_tokens:
+            # Too little of this chunk fits to be worth a fragment; a shorter one further down may fit whole
+            continue
+
+        seen_sentences.update(taken)
+        kept_words.append(words)
+        packed['returned_text'].append(" ".join(taken))
+        packed['source'].append(source)
+        packed['score'].append(score)
+        packed['chunk_id'].append(chunk_id)
+        packed['page'].append(page)
+        used += taken_tokens + (separator_tokens if len(packed['returned_text']) > 1 else 0)
+        if len(taken) < len(sentences):
+            break
+
+    packed['tokens'] = count_tokens_batch([SEPARATOR.join(packed['returned_text'])], model_used)[0]
+    return packed
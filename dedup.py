@@ -0,0 +1,164 @@
+import re
+import zlib
+
+import numpy as np
+
+from config import dedup_bands, dedup_cosine, dedup_jaccard, dedup_num_perm, dedup_shingle_size, \
+    dedup_skip_jaccard
+
+WORD_PATTERN = re.compile(r"\w+")
+# Multiply-shift hash family: (a * x + b) mod 2**64, keeping the high 32 bits
+_rng = np.random.default_rng(20240229)
+_A = _rng.integers(0, 1 << 63, dedup_num_perm, dtype='uint64') * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, dedup_num_perm, dtype='uint64')
+
+
+def shingles(text, size=dedup_shingle_size):
+    """Set of lowercased word n-grams; a text shorter than `size` words is a single shingle"""
+    words = WORD_PATTERN.findall(text.lower())
+    return {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))} if words else set()
+
+
+def signature(text):
+    """MinHash signature of the text's shingles, or None for a text without words"""
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype='uint64', count=len(grams))
+    return ((hashes[:, None] * _A + _B) >> np.uint64(32)).min(axis=0).astype('uint32')
+
+
+def similarity(a, b):
+    """MinHash estimate of the Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+class MinHashIndex:
+    """Locality-sensitive hashing over MinHash signatures: texts sharing any band are candidates.
+
+    With r rows per band, pairs are found with probability 1 - (1 - J^r)^bands, a steep
+    curve around (1 / bands) ** (1 / r). Not thread-safe by itself; `VectorStore` guards it.
+    """
+
+    def __init__(self, bands=dedup_bands):
+        self.bands = bands
+        self.rows = dedup_num_perm // bands
+        self.signatures = {}
+        self.buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, sig):
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, text=None, sig=None):
+        sig = signature(text) if sig is None else sig
+        if sig is None:
+            return
+        self.signatures[key] = sig
+        for bucket, band in zip(self.buckets, self._band_keys(sig)):
+            bucket.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        sig = self.signatures.pop(key, None)
+        if sig is None:
+            return
+        for bucket, band in zip(self.buckets, self._band_keys(sig)):
+            keys = bucket[band]
+            keys.discard(key)
+            if not keys:
+                del bucket[band]
+
+    def clear(self):
+        self.signatures = {}
+        self.buckets = [{} for _ in range(self.bands)]
+
+    def best_match(self, sig):
+        """(key, estimated Jaccard) of the most similar indexed text, or (None, 0.0)"""
+        candidates = set()
+        for bucket, band in zip(self.buckets, self._band_keys(sig)):
+            candidates.update(bucket.get(band, ()))
+        best, best_similarity = None, 0.0
+        for key in candidates:
+            score = similarity(sig, self.signatures[key])
+            if score > best_similarity:
+                best, best_similarity = key, score
+        return best, best_similarity
+
+
+class Deduplicator:
+    """Drops chunks that nearly repeat one already in the store or earlier in the same ingest run.
+
+    MinHash finds candidates before anything is embedded. Candidates at or above
+    `skip_jaccard` are dropped without embedding them; the rest of the candidates
+    are embedded and dropped only if their cosine similarity to the chunk they
+    repeat reaches `cosine`. Chunks of this run are referred to by their position
+    in the sequence of texts passed to `filter`.
+    """
+
+    def __init__(self, store, jaccard=dedup_jaccard, skip_jaccard=dedup_skip_jaccard, cosine=dedup_cosine):
+        self.store = store
+        self.jaccard = jaccard
+        self.skip_jaccard = skip_jaccard
+        self.cosine = cosine
+        self.local = MinHashIndex()
+        self.vectors = {}  # position -> embedding of kept chunks that others were matched to
+        self.position = 0
+        self.stats = {'chunks': 0, 'duplicates': 0, 'unembedded': 0, 'rejected': 0}
+
+    def _match(self, sig):
+        if sig is None:
+            return None, 0.0
+        key, score = self.local.best_match(sig)
+        stored_key, stored_score = self.store.near_duplicate(sig)
+        if stored_score > score:
+            key, score = ('store', stored_key), stored_score
+        elif key is not None:
+            key = ('new', key)
+        return (key, score) if score >= self.jaccard else (None, 0.0)
+
+    def filter(self, texts, encode):
+        """Split texts into kept chunks and near-duplicates.
+
+        `encode(texts)` returns their embeddings. Returns (kept indices into `texts`,
+        their embeddings, [(index into `texts`, ('store', chunk ID) or ('new', position))]).
+        """
+        start = self.position
+        self.position += len(texts)
+        self.stats['chunks'] += len(texts)
+        matches = []
+        for offset, text in enumerate(texts):
+            sig = signature(text)
+            match, score = self._match(sig)
+            matches.append((match, score))
+            if match is None and sig is not None:
+                # Only kept chunks become match targets, so a duplicate always points at a stored chunk
+                self.local.add(start + offset, sig=sig)
+
+        to_embed = [i for i, (match, score) in enumerate(matches) if match is None or score < self.skip_jaccard]
+        embeddings = encode([texts[i] for i in to_embed]) if to_embed else None
+        vectors = dict(zip(to_embed, embeddings)) if to_embed else {}
+
+        # Embedding similarity confirms the candidates MinHash was not certain about
+        stored = [match[1] for match, score in matches if match is not None and match[0] == 'store'
+                  and score < self.skip_jaccard]
+        stored_vectors = self.store.cached_vectors(stored) if stored else {}
+        kept, duplicates = [], []
+        for i, (match, score) in enumerate(matches):
+            if match is not None and score < self.skip_jaccard:
+                target = stored_vectors.get(match[1]) if match[0] == 'store' else self.vectors.get(match[1])
+                if target is None or float(vectors[i] @ target) < self.cosine * np.linalg.norm(vectors[i]) * \
+                        np.linalg.norm(target):
+                    self.stats['rejected'] += 1
+                    match = None
+            if match is None:
+                kept.append(i)
+                if start + i in self.local.signatures:
+                    self.vectors[start + i] = vectors[i]
+            else:
+                duplicates.append((i, match))
+                self.stats['duplicates'] += 1
+                self.stats['unembedded'] += i not in vectors
+        kept_embeddings = np.vstack([vectors[i] for i in kept]) if kept else None
+        return kept, kept_embeddings, duplicates
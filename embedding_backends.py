@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from config import embedding_backend, embedding_batch_size, embedding_model, onnx_model_dir, onnx_threads
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def embedding_id(name=embedding_model, backend=embedding_backend):
+    """Identity of the vectors a model/backend pair produces, used to key cached embeddings.
+
+    The fp32 ONNX export reproduces the PyTorch vectors, so both share the model name;
+    int8 vectors differ slightly and are cached separately.
+    """
+    return f"{name}@{backend}" if backend == 'onnx-int8' else name
+
+
+def onnx_dir_for(name=embedding_model):
+    return os.path.join(onnx_model_dir, re.sub(r'[^A-Za-z0-9_.-]+', '_', name))
+
+
+def export_onnx(name=embedding_model, directory=None):
+    """Export a SentenceTransformer's transformer to ONNX, with its tokenizer and pooling settings"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    directory = directory or onnx_dir_for(name)
+    model = SentenceTransformer(name, device='cpu')
+    transformer = model[0]
+    pooling = model[1].get_config_dict()
+    if pooling.get('pooling_mode_cls_token'):
+        mode = 'cls'
+    elif pooling.get('pooling_mode_mean_tokens'):
+        mode = 'mean'
+    else:
+        raise ValueError(f"Unsupported pooling for ONNX export: {pooling}")
+
+    os.makedirs(directory, exist_ok=True)
+    transformer.tokenizer.save_pretrained(directory)
+    sample = transformer.tokenizer(["An example sentence to trace the model with."], return_tensors='pt')
+    input_names = list(sample.keys())
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {input_name: {0: 'batch', 1: 'sequence'} for input_name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(HiddenStates(transformer.auto_model).eval(), tuple(sample[n] for n in input_names),
+                          os.path.join(directory, 'model.onnx'), input_names=input_names,
+                          output_names=['last_hidden_state'], dynamic_axes=dynamic_axes, opset_version=14)
+
+    with open(os.path.join(directory, 'pipeline.json'), 'w') as f:
+        json.dump({
+            'model': name,
+            'pooling': mode,
+            'normalize': any(type(module).__name__ == 'Normalize' for module in model),
+            'max_seq_length': model.max_seq_length,
+            'dimension': model.get_sentence_embedding_dimension(),
+        }, f, indent=2)
+    print(f"📦 Exported '{name}' to ONNX in '{directory}'")
+    return directory
+
+
+def quantize_onnx(directory):
+    """Write an int8 dynamically quantized copy of the exported model"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(os.path.join(directory, 'model.onnx'), os.path.join(directory, 'model.int8.onnx'),
+                     weight_type=QuantType.QInt8)
+    print(f"📦 Quantized ONNX model to int8 in '{directory}'")
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible `encode` running an exported model on ONNX Runtime.
+
+    Only onnxruntime and the tokenizer are needed at runtime, not PyTorch.
+    """
+
+    def __init__(self, directory, quantized=False):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, 'pipeline.json')) as f:
+            self.pipeline = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if onnx_threads:
+            options.intra_op_num_threads = onnx_threads
+        path = os.path.join(directory, 'model.int8.onnx' if quantized else 'model.onnx')
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.max_seq_length = self.pipeline['max_seq_length']
+
+    def get_sentence_embedding_dimension(self):
+        return self.pipeline['dimension']
+
+    def encode(self, sentences, batch_size=embedding_batch_size, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        embeddings = np.empty((len(sentences), self.pipeline['dimension']), dtype='float32')
+        # Batch texts of similar length together so padding stays short
+        order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+        for start in range(0, len(sentences), batch_size):
+            rows = order[start:start + batch_size]
+            encoded = self.tokenizer([sentences[i] for i in rows], padding=True, truncation=True,
+                                     max_length=self.max_seq_length, return_tensors='np')
+            feed = {key: value.astype('int64') for key, value in encoded.items() if key in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+            if self.pipeline['pooling'] == 'cls':
+                pooled = hidden[:, 0]
+            else:
+                mask = encoded['attention_mask'][..., None].astype('float32')
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.pipeline['normalize']:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings[rows] = pooled
+        return embeddings[0] if single else embeddings
+
+
+def load_embedder(name=embedding_model, backend=embedding_backend):
+    """Build the embedding model for a backend, exporting/quantizing the ONNX model on first use"""
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(name)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'")
+
+    directory = onnx_dir_for(name)
+    if not os.path.exists(os.path.join(directory, 'model.onnx')):
+        export_onnx(name, directory)
+    quantized = backend == 'onnx-int8'
+    if quantized and not os.path.exists(os.path.join(directory, 'model.int8.onnx')):
+        quantize_onnx(directory)
+    return OnnxEmbedder(directory, quantized=quantized)
+
+
+def reembed_store(name=embedding_model, backend=embedding_backend):
+    """Re-encode every chunk in the persisted store with the given backend, keeping chunk IDs"""
+    from embedding_cache import encode_with_cache
+    from store import get_vector_store
+
+    store = get_vector_store()
+    ids, texts, _, _ = store.snapshot()
+    if not ids:
+        print("Vector store is empty; nothing to re-embed")
+        return 0
+    start = time.perf_counter()
+    embeddings, _ = encode_with_cache(load_embedder(name, backend), texts, embedding_id(name, backend))
+    store.reindex(ids, embeddings, embedding_id(name, backend))
+    store.save()
+    print(f"🔁 Re-embedded {len(ids)} chunks with the {backend} backend in {time.perf_counter() - start:.1f}s")
+    return len(ids)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prepare ONNX embedding models or re-embed the vector store")
+    parser.add_argument('command', choices=['export', 'reembed'])
+    parser.add_argument('--model', default=embedding_model)
+    parser.add_argument('--backend', choices=BACKENDS, default=embedding_backend)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_dir = export_onnx(args.model)
+        quantize_onnx(export_dir)
+    else:
+        reembed_store(args.model, args.backend)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from config import embedding_cache_enabled, embedding_cache_path
+from embedding_backends import embedding_id
+
+
+def chunk_key(text, model_name=embedding_id()):
+    """Content address of a chunk embedding: hash of (model name, chunk text)"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache in SQLite, keyed by `chunk_key`"""
+
+    def __init__(self, path=embedding_cache_path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)'
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys present in the cache"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype='float32')
+        return found
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype='float32')
+        rows = [(key, int(vector.shape[0]), vector.tobytes()) for key, vector in zip(keys, vectors)]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)', rows)
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Process-wide embedding cache, or None when caching is disabled"""
+    global _cache
+    if not embedding_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def encode_with_cache(model, texts, model_name=embedding_id()):
+    """Encode texts, serving previously seen chunks from the cache.
+
+    Returns the float32 embedding matrix and a stats dict with hits, misses and hit_rate.
+    """
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        embeddings = np.asarray(model.encode(texts), dtype='float32')
+        return embeddings, {'hits': 0, 'misses': len(texts), 'hit_rate': 0.0}
+
+    keys = [chunk_key(text, model_name) for text in texts]
+    cached = cache.get_many(keys)
+
+    # Encode each missing text once, even if it repeats within this batch
+    missing = list(dict.fromkeys(key for key in keys if key not in cached))
+    if missing:
+        text_by_key = dict(zip(keys, texts))
+        new_embeddings = np.asarray(model.encode([text_by_key[key] for key in missing]), dtype='float32')
+        cache.put_many(missing, new_embeddings)
+        cached.update(zip(missing, new_embeddings))
+
+    embeddings = np.vstack([cached[key] for key in keys]).astype('float32')
+    hits = len(texts) - len(missing)
+    return embeddings, {'hits': hits, 'misses': len(missing), 'hit_rate': hits / len(texts)}
@@ -0,0 +1,303 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from chunker import Chunker, batched
+from config import dedup_enabled, embedding_batch_size, ingest_workers, ocr_workers
+from metrics import get_metrics, observe, span
+
+
+def extract_and_chunk(path, ocr_threads=ocr_workers):
+    """Read one PDF page by page and split it into chunks; runs inside a worker process"""
+    from pdf_handler import Handle_pdf
+
+    start = time.perf_counter()
+    chunker = Chunker()
+    characters = 0
+    chunks = []
+    pages = []
+    page_count = 0
+    chunking_seconds = 0.0
+    # Spans recorded here are handed back to the parent process, which owns the metrics registry
+    with get_metrics().capture() as events:
+        for page_number, text in Handle_pdf(path).read_pages(workers=ocr_threads):
+            page_count += 1
+            characters += len(text)
+            chunk_start = time.perf_counter()
+            for chunk in chunker.chunk_text(text):
+                chunks.append(chunk)
+                pages.append(page_number)
+            chunking_seconds += time.perf_counter() - chunk_start
+        seconds = time.perf_counter() - start
+        observe('pdf_extraction', seconds - chunking_seconds, page_count)
+        observe('chunking', chunking_seconds, len(chunks))
+    return {
+        'chunks': chunks,
+        'pages': pages,
+        'characters': characters,
+        'sentences': chunker.sentence_count,
+        'seconds': seconds,
+        'metrics': events,
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_size():
+    return ingest_workers or os.cpu_count()
+
+
+def get_pool():
+    """Process pool shared by all sessions, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent holds torch and Streamlit threads that do not survive a fork
+            _pool = ProcessPoolExecutor(max_workers=_pool_size(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _no_progress(source, stage, detail=""):
+    pass
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def extract_all(files, progress=_no_progress, cancel=None):
+    """Extract and chunk (source, path) pairs concurrently.
+
+    Yields (source, result) in completion order; result is None when a file failed.
+    Stops early, dropping files not yet started, once the `cancel` event is set.
+    """
+    pool = get_pool()
+    # Files are already spread over every core, so each one OCRs its scanned pages with a share of them
+    ocr_threads = ocr_workers or max(1, os.cpu_count() // min(len(files), _pool_size()))
+    futures = {pool.submit(extract_and_chunk, path, ocr_threads): source for source, path in files}
+    for future in as_completed(futures):
+        if _cancelled(cancel):
+            for pending in futures:
+                pending.cancel()
+            return
+        source = futures[future]
+        try:
+            result = future.result()
+            get_metrics().merge(result.pop('metrics', None))
+            yield source, result
+        except BrokenProcessPool as e:
+            _reset_pool()
+            progress(source, 'failed', f"worker crashed: {e}")
+            yield source, None
+        except Exception as e:
+            progress(source, 'failed', str(e))
+            yield source, None
+
+
+def embed_unique(model, texts, dedup=None):
+    """Embed texts through the embedding cache, leaving out near-duplicates when a Deduplicator is given.
+
+    Returns (kept indices into `texts`, their embeddings, [(index, ('store' | 'new', target))], cache stats).
+    """
+    from embedding_cache import encode_with_cache
+
+    cache_stats = {'hits': 0, 'misses': 0}
+
+    def encode(batch):
+        with span('embedding', items=len(batch)):
+            embeddings, stats = encode_with_cache(model, batch)
+        cache_stats['hits'] += stats['hits']
+        cache_stats['misses'] += stats['misses']
+        return embeddings
+
+    if dedup is None:
+        return list(range(len(texts))), encode(texts), [], cache_stats
+    kept, embeddings, duplicates = dedup.filter(texts, encode)
+    return kept, embeddings, duplicates, cache_stats
+
+
+def _new_deduplicator(store):
+    from dedup import Deduplicator
+    return Deduplicator(store) if dedup_enabled else None
+
+
+def _report_dedup(dedup):
+    if dedup is not None and dedup.stats['duplicates']:
+        print(f"♻️ Linked {dedup.stats['duplicates']} of {dedup.stats['chunks']} chunks to near-duplicates "
+              f"instead of indexing them ({dedup.stats['unembedded']} never embedded)")
+
+
+def _indexed_detail(stored, linked):
+    return f"{stored} chunks added" + (f", {linked} near-duplicates linked" if linked else "")
+
+
+def ingest_files(files, progress=_no_progress, cancel=None, store=None):
+    """Extract and chunk PDFs in parallel, embed all chunks in one batch, and add them to the store.
+
+    `files` is a list of (source name, path). `progress(source, stage, detail)` is called
+    from the calling thread with stage 'chunked', 'indexed' or 'failed'.
+    Setting the optional `cancel` event stops the work before anything is added to the store.
+    `store` defaults to the shared store; pass a knowledge base shard to fill that instead.
+    Returns {source: number of chunks added} for the files that made it into the store.
+    """
+    # Imported here so worker processes, which import this module, never load the embedding model
+    from models import get_embedding_model
+    from utils import get_store
+
+    if store is None:
+        store = get_store()
+
+    if len(files) == 1:
+        # Not worth starting worker processes for a single file; stream it instead
+        source, path = files[0]
+        try:
+            count = ingest_streaming(source, path, progress, cancel, store)
+        except Exception as e:
+            progress(source, 'failed', str(e))
+            return {}
+        return {source: count} if count else {}
+
+    extracted = {}
+    for source, result in extract_all(files, progress, cancel):
+        if result is None:
+            continue
+        if not result['chunks']:
+            progress(source, 'failed', "no text could be extracted")
+            continue
+        extracted[source] = result
+        progress(source, 'chunked',
+                 f"{len(result['chunks'])} chunks from {result['characters']:,} characters "
+                 f"in {result['seconds']:.1f}s")
+
+    if not extracted or _cancelled(cancel):
+        return {}
+
+    all_chunks = [chunk for result in extracted.values() for chunk in result['chunks']]
+    all_pages = [page for result in extracted.values() for page in result['pages']]
+    dedup = _new_deduplicator(store)
+    start = time.perf_counter()
+    kept, embeddings, duplicates, cache_stats = embed_unique(get_embedding_model(), all_chunks, dedup)
+    encoded = cache_stats['hits'] + cache_stats['misses']
+    print(f"🧠 Embedded {encoded} chunks in {time.perf_counter() - start:.1f}s "
+          f"(cache hit rate {cache_stats['hits'] / max(encoded, 1):.0%})")
+    _report_dedup(dedup)
+    if _cancelled(cancel):
+        return {}
+
+    rows = {position: row for row, position in enumerate(kept)}
+    duplicate_of = dict(duplicates)
+    chunk_ids = {}  # position of a kept chunk -> its chunk ID
+    added = {}
+    offset = 0
+    for source, result in extracted.items():
+        chunk_range = range(offset, offset + len(result['chunks']))
+        offset += len(chunk_range)
+        keep = [i for i in chunk_range if i in rows]
+        if keep:
+            ids = store.add(embeddings[[rows[i] for i in keep]], [all_chunks[i] for i in keep], source,
+                            pages=[all_pages[i] for i in keep])
+            chunk_ids.update(zip(keep, ids))
+        links = [(_resolve(duplicate_of[i], chunk_ids), all_pages[i]) for i in chunk_range if i in duplicate_of]
+        if links:
+            store.link(source, links)
+        added[source] = len(chunk_range)
+        progress(source, 'indexed', _indexed_detail(len(keep), len(links)))
+    store.save()
+    return added
+
+
+def _resolve(target, chunk_ids):
+    """Chunk ID a near-duplicate links to: a stored chunk, or a chunk kept earlier in this run"""
+    kind, key = target
+    return key if kind == 'store' else chunk_ids[key]
+
+
+def _timed(items, totals):
+    """Pass items through, adding the time spent producing them and their count to `totals`"""
+    items = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            totals[0] += time.perf_counter() - start
+            return
+        totals[0] += time.perf_counter() - start
+        totals[1] += 1
+        yield item
+
+
+def ingest_streaming(source, path, progress=_no_progress, cancel=None, store=None):
+    """Ingest one PDF in-process with extraction, chunking and embedding pipelined page by page.
+
+    Only the current page's text is held, but every kept chunk and its embedding stay in
+    memory until they are added to the store together at the end, so a document that is
+    cancelled or fails partway leaves nothing behind. Returns the number of chunks added.
+    """
+    from models import get_embedding_model
+    from pdf_handler import Handle_pdf
+    from utils import get_store
+
+    model = get_embedding_model()
+    if store is None:
+        store = get_store()
+    dedup = _new_deduplicator(store)
+    start = time.perf_counter()
+    chunker = Chunker()
+    total, page_numbers = 0, set()
+    cache_hits = cache_misses = 0
+    positions, chunks, pages, embedding_batches, duplicates = [], [], [], [], []
+    # [seconds, count] spent reading pages, and reading plus chunking them
+    page_timing, chunk_timing = [0.0, 0], [0.0, 0]
+    page_chunks = chunker.page_chunks(_timed(Handle_pdf(path).read_pages(), page_timing))
+    for batch in batched(_timed(page_chunks, chunk_timing), embedding_batch_size):
+        if _cancelled(cancel):
+            return 0
+        batch_pages, batch_chunks = zip(*batch)
+        kept, embeddings, batch_duplicates, cache_stats = embed_unique(model, list(batch_chunks), dedup)
+        cache_hits += cache_stats['hits']
+        cache_misses += cache_stats['misses']
+        if kept:
+            embedding_batches.append(embeddings)
+        positions.extend(total + i for i in kept)
+        chunks.extend(batch_chunks[i] for i in kept)
+        pages.extend(batch_pages[i] for i in kept)
+        duplicates.extend((target, batch_pages[i]) for i, target in batch_duplicates)
+        total += len(batch_chunks)
+        page_numbers.update(batch_pages)
+    observe('pdf_extraction', page_timing[0], page_timing[1])
+    observe('chunking', chunk_timing[0] - page_timing[0], chunk_timing[1])
+
+    if _cancelled(cancel):
+        return 0
+    if not total:
+        progress(source, 'failed', "no text could be extracted")
+        return 0
+    progress(source, 'chunked', f"{total} chunks from {len(page_numbers)} pages "
+                                f"in {time.perf_counter() - start:.1f}s")
+    encoded = cache_hits + cache_misses
+    print(f"🧠 Embedded {encoded} chunks (cache hit rate {cache_hits / max(encoded, 1):.0%})")
+    _report_dedup(dedup)
+
+    chunk_ids = {}
+    if chunks:
+        chunk_ids = dict(zip(positions, store.add(np.vstack(embedding_batches), chunks, source, pages=pages)))
+    if duplicates:
+        store.link(source, [(_resolve(target, chunk_ids), page) for target, page in duplicates])
+    store.save()
+    progress(source, 'indexed', _indexed_detail(len(chunks), len(duplicates)))
+    return total
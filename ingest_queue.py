@@ -0,0 +1,158 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config import ingest_job_history
+from metrics import span
+
+ACTIVE = ('queued', 'running')
+
+
+class IngestJob:
+    """One upload submitted for background ingestion, with per-file progress"""
+
+    def __init__(self, files, directory):
+        self.id = uuid.uuid4().hex[:8]
+        self.files = files
+        self.directory = directory
+        self.status = 'queued'
+        self.error = None
+        self.added = {}
+        # source -> (stage, detail), as reported by ingest_files
+        self.file_status = {source: ('queued', "") for source, _ in files}
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    def report(self, source, stage, detail=""):
+        self.file_status[source] = (stage, detail)
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    @property
+    def progress(self):
+        """Fraction of the two per-file stages (chunked, then indexed or failed) completed"""
+        done = sum(2 if stage in ('indexed', 'failed') else 1 if stage == 'chunked' else 0
+                   for stage, _ in self.file_status.values())
+        return done / (2 * len(self.file_status)) if self.file_status else 1.0
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class IngestQueue:
+    """Background worker that ingests uploads one job at a time, so page scripts never block on it.
+
+    Jobs run sequentially: ingest_files already parallelizes extraction across processes,
+    and the chat keeps querying the store, which only locks briefly while chunks are added.
+    """
+
+    def __init__(self, history=ingest_job_history):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._worker = None
+
+    def submit(self, uploads):
+        """Queue [(source name, file bytes)] for ingestion and return the job ID"""
+        directory = tempfile.mkdtemp(prefix='ingest_')
+        files = []
+        with span('upload_write', items=len(uploads)):
+            for i, (source, data) in enumerate(uploads):
+                path = os.path.join(directory, f'{i}.pdf')
+                with open(path, 'wb') as f:
+                    f.write(data)
+                files.append((source, path))
+        job = IngestJob(files, directory)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='ingest-worker', daemon=True)
+                self._worker.start()
+        self._pending.put(job)
+        print(f"📥 Queued ingest job {job.id} with {len(files)} file(s)")
+        return job.id
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_sources(self):
+        """Sources of queued or running jobs, so repeat uploads are not submitted twice"""
+        return {source for job in self.jobs() if job.active for source, _ in job.files}
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or stop a running one before it adds anything to the store"""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        from ingest import ingest_files
+
+        while True:
+            job = self._pending.get()
+            try:
+                if job.cancel_event.is_set():
+                    job.status = 'cancelled'
+                    continue
+                job.status = 'running'
+                job.started = time.time()
+                try:
+                    job.added = ingest_files(job.files, progress=job.report, cancel=job.cancel_event)
+                except Exception as e:
+                    job.status, job.error = 'failed', str(e)
+                    print(f"❌ Ingest job {job.id} failed: {e}")
+                    continue
+                if job.cancel_event.is_set() and not job.added:
+                    job.status = 'cancelled'
+                elif not job.added:
+                    job.status = 'failed'
+                else:
+                    job.status = 'done'
+                print(f"📥 Ingest job {job.id} {job.status} in {job.elapsed:.1f}s")
+            finally:
+                job.finished = time.time()
+                if job.status == 'cancelled':
+                    for source, (stage, _) in job.file_status.items():
+                        if stage not in ('indexed', 'failed'):
+                            job.report(source, 'cancelled')
+                shutil.rmtree(job.directory, ignore_errors=True)
+                self._pending.task_done()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_ingest_queue():
+    """Process-wide ingestion queue shared by every session"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestQueue()
+    return _queue
@@ -0,0 +1,121 @@
+"""Named knowledge bases, each a local vector store shard under `knowledge_base_dir`.
+
+Fill them from directories of PDFs, one knowledge base per subdirectory:
+    python knowledge_bases.py ingest myFiles
+"""
+import argparse
+import heapq
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import knowledge_base_dir, knowledge_base_labels, knowledge_base_search_workers
+from store import VectorStore
+
+_shards = {}
+_shards_lock = threading.Lock()
+_executor = None
+
+
+def shard_directory(name):
+    return os.path.join(knowledge_base_dir, re.sub(r'[^A-Za-z0-9_.-]+', '_', name))
+
+
+def get_knowledge_base(name, create=False):
+    """Process-wide vector store shard of a knowledge base, loaded from disk on first use.
+
+    Returns None for a knowledge base without a shard on disk unless `create` is set,
+    so reading a misspelt name does not leave an empty shard behind.
+    """
+    shard = _shards.get(name)
+    if shard is None:
+        with _shards_lock:
+            shard = _shards.get(name)
+            if shard is None:
+                directory = shard_directory(name)
+                if not create and not os.path.isdir(directory):
+                    return None
+                shard = VectorStore(directory=directory)
+                shard.load()
+                _shards[name] = shard
+    return shard
+
+
+def list_knowledge_bases():
+    """Configured knowledge bases, then any other shard found on disk"""
+    names = list(knowledge_base_labels)
+    if os.path.isdir(knowledge_base_dir):
+        names += sorted(name for name in os.listdir(knowledge_base_dir)
+                        if name not in names and os.path.isdir(os.path.join(knowledge_base_dir, name)))
+    return names
+
+
+def label(name):
+    return knowledge_base_labels.get(name, name)
+
+
+def _get_executor():
+    global _executor
+    with _shards_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=knowledge_base_search_workers,
+                                           thread_name_prefix='kb-search')
+        return _executor
+
+
+def search(query_embedding, names, min_score=0.0, page_size=10):
+    """Best `page_size` chunks scoring at least `min_score` across the named knowledge bases.
+
+    Each shard returns its own top `page_size`, which is all a global top `page_size`
+    can draw on; several shards are searched in parallel (FAISS releases the GIL).
+    Returns (score, knowledge base, chunk_id, text, source, page) tuples, best first.
+    """
+    def search_shard(name):
+        shard = get_knowledge_base(name)
+        if shard is None:
+            return []
+        results = shard.search(query_embedding, page_size)
+        return [(result[0], name) + result[1:] for result in results if result[0] >= min_score]
+
+    if len(names) == 1:
+        results = search_shard(names[0])
+    else:
+        results = [result for shard_results in _get_executor().map(search_shard, names)
+                   for result in shard_results]
+    return heapq.nlargest(page_size, results, key=lambda result: result[0])
+
+
+def ingest_directories(root, batch_size=16, prune=False):
+    """Ingest each subdirectory of `root` into the knowledge base of the same name; returns failed files"""
+    from bulk_ingest import run
+
+    failed = 0
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        print(f"📚 Knowledge base '{name}'")
+        failed += run([path], batch_size, prune, os.path.join(shard_directory(name), 'ingest_manifest.json'),
+                      store=get_knowledge_base(name, create=True))
+    return failed
+
+
+if __name__ == '__main__':
+    # Guarded: the ingestion process pool starts workers with spawn, which re-imports this module
+    parser = argparse.ArgumentParser(description="Build or inspect the local knowledge base shards")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = subcommands.add_parser('ingest', help="one knowledge base per subdirectory of ROOT")
+    ingest_parser.add_argument('root', nargs='?', default='myFiles')
+    ingest_parser.add_argument('--batch-size', type=int, default=16, help="files per checkpoint")
+    ingest_parser.add_argument('--prune', action='store_true', help="remove documents whose file no longer exists")
+    subcommands.add_parser('list', help="documents and chunks per knowledge base")
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        sys.exit(1 if ingest_directories(args.root, args.batch_size, args.prune) else 0)
+    for kb_name in list_knowledge_bases():
+        shard = get_knowledge_base(kb_name)
+        counts = shard.source_counts() if shard is not None else {}
+        print(f"{kb_name:<24} {label(kb_name):<24} {len(counts):>5} documents {sum(counts.values()):>8} chunks")
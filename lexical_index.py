@@ -0,0 +1,109 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+from config import bm25_b, bm25_k1, hybrid_lexical_weight, hybrid_rrf_k
+
+# Words plus identifiers such as report numbers and part codes ("RPT-2023-114", "v2.1", "A/B-7")
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text):
+    """Lowercased terms; a compound identifier is indexed whole and by its parts"""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[-./]", token) if part)
+    return terms
+
+
+class BM25Index:
+    """Inverted index over chunk texts, scored with Okapi BM25 and updated in place.
+
+    Postings live on disk in the store's `ChunkStore` and are read per query term,
+    so opening a store neither re-tokenizes its chunks nor holds the index in memory.
+    Not thread-safe by itself; `VectorStore` guards it with the store lock.
+    """
+
+    def __init__(self, chunk_store, k1=bm25_k1, b=bm25_b):
+        self.chunk_store = chunk_store
+        self.k1 = k1
+        self.b = b
+        self.count, self.total_length = chunk_store.lexical_totals()
+
+    def __len__(self):
+        return self.count
+
+    def add_many(self, chunks):
+        """Index (chunk ID, text) pairs"""
+        entries = [(chunk_id, Counter(tokenize(text))) for chunk_id, text in chunks]
+        if not entries:
+            return
+        self.chunk_store.add_postings(entries)
+        self.count += len(entries)
+        self.total_length += sum(sum(counts.values()) for _, counts in entries)
+
+    def add(self, chunk_id, text):
+        self.add_many([(chunk_id, text)])
+
+    def remove_many(self, chunks):
+        """Drop (chunk ID, text) pairs; each text must be the one the chunk was added with"""
+        removed, length = self.chunk_store.remove_postings([(chunk_id, set(tokenize(text)))
+                                                            for chunk_id, text in chunks])
+        self.count -= removed
+        self.total_length -= length
+
+    def remove(self, chunk_id, text):
+        self.remove_many([(chunk_id, text)])
+
+    def clear(self):
+        # The chunk store drops the postings along with the chunks
+        self.count = 0
+        self.total_length = 0
+
+    def search(self, query, top_k):
+        """Return up to top_k (score, chunk_id) pairs, best first"""
+        if not self.count:
+            return []
+        n = self.count
+        average_length = self.total_length / n or 1.0
+        scores = {}
+        for postings in self.chunk_store.postings(set(tokenize(query))).values():
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf, length in postings:
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return [(score, chunk_id) for chunk_id, score in heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])]
+
+    def matching(self, query):
+        """IDs of the chunks containing every term of the query"""
+        terms = set(tokenize(query))
+        if not terms:
+            return set()
+        found = self.chunk_store.postings(terms)
+        if len(found) < len(terms):
+            return set()
+        postings = sorted(found.values(), key=len)
+        ids = {chunk_id for chunk_id, _, _ in postings[0]}
+        for other in postings[1:]:
+            ids.intersection_update(chunk_id for chunk_id, _, _ in other)
+            if not ids:
+                break
+        return ids
+
+
+def fuse_rankings(dense, lexical, lexical_weight=hybrid_lexical_weight, k=hybrid_rrf_k):
+    """Reciprocal rank fusion of two best-first lists of (score, chunk_id, ...) results.
+
+    The fused score replaces the original one; chunks found by both rankings rise to the top.
+    """
+    fused = {}
+    for weight, results in ((1.0, dense), (lexical_weight, lexical)):
+        for rank, result in enumerate(results):
+            score, row = fused.get(result[1], (0.0, result))
+            fused[result[1]] = (score + weight / (k + rank + 1), row)
+    ordered = sorted(fused.values(), key=lambda item: item[0], reverse=True)
+    return [(score,) + row[1:] for score, row in ordered]
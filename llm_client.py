@@ -0,0 +1,185 @@
+import email.utils
+import random
+import threading
+import time
+import weakref
+
+from config import (llm_backoff_base, llm_backoff_max, llm_connect_timeout, llm_max_concurrency, llm_max_retries,
+                    llm_timeout, openai_base_url)
+from metrics import observe, span
+
+
+def retryable_errors():
+    """429, 5xx and network failures are worth another try; other 4xx errors are not"""
+    # openai takes about a second to import, so it is loaded with the first request rather than the app
+    import openai
+    return openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retry `attempt` (0-based), honoring the server's retry-after header"""
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    if headers.get('retry-after-ms'):
+        try:
+            return min(float(headers['retry-after-ms']) / 1000, llm_backoff_max)
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return min(float(retry_after), llm_backoff_max)
+        except ValueError:
+            try:
+                date = email.utils.parsedate_to_datetime(retry_after)
+                return min(max(0.0, date.timestamp() - time.time()), llm_backoff_max)
+            except (TypeError, ValueError):
+                pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(llm_backoff_base * 2 ** attempt, llm_backoff_max))
+
+
+class LLMClient:
+    """OpenAI clients shared by every session, one per API key.
+
+    Each client keeps its HTTP connections alive between calls. A semaphore bounds the
+    number of in-flight requests across the whole process, and 429/5xx/network errors
+    are retried with exponential backoff.
+    """
+
+    def __init__(self, max_concurrency=llm_max_concurrency, max_retries=llm_max_retries):
+        self.max_retries = max_retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._connections = weakref.WeakSet()
+        self._stats = {
+            'calls': 0,
+            'requests': 0,
+            'new_connections': 0,
+            'reused_connections': 0,
+            'retries': 0,
+            'failures': 0,
+            'in_flight': 0,
+            'queue_wait_total': 0.0,
+            'queue_wait_max': 0.0,
+        }
+
+    def client(self, api_key, base_url=openai_base_url):
+        with self._lock:
+            key = (api_key, base_url)
+            if key not in self._clients:
+                import openai
+                http_client = openai.DefaultHttpxClient(event_hooks={'response': [self._track_connection]})
+                self._clients[key] = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=openai.Timeout(llm_timeout, connect=llm_connect_timeout),
+                    max_retries=0,  # retries are ours, so they respect the concurrency limit
+                    http_client=http_client,
+                )
+            return self._clients[key]
+
+    def _track_connection(self, response):
+        # httpx exposes the socket stream a response came over; seeing it again means keep-alive worked
+        stream = response.extensions.get('network_stream')
+        with self._lock:
+            if stream is None:
+                return
+            if stream in self._connections:
+                self._stats['reused_connections'] += 1
+            else:
+                self._connections.add(stream)
+                self._stats['new_connections'] += 1
+
+    def _acquire(self):
+        start = time.perf_counter()
+        self._slots.acquire()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['in_flight'] += 1
+            self._stats['queue_wait_total'] += waited
+            self._stats['queue_wait_max'] = max(self._stats['queue_wait_max'], waited)
+        return waited
+
+    def _release(self):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+        self._slots.release()
+
+    def _create(self, api_key, **kwargs):
+        """chat.completions.create with retries; the caller holds a concurrency slot"""
+        client = self.client(api_key)
+        retryable = retryable_errors()
+        for attempt in range(self.max_retries + 1):
+            with self._lock:
+                self._stats['requests'] += 1
+            try:
+                return client.chat.completions.create(**kwargs)
+            except retryable as e:
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self._stats['failures'] += 1
+                    raise
+                delay = retry_delay(e, attempt)
+                print(f"⏳ OpenAI request failed ({type(e).__name__}); retrying in {delay:.1f}s")
+                with self._lock:
+                    self._stats['retries'] += 1
+                time.sleep(delay)
+
+    def complete(self, api_key, **kwargs):
+        """Return a chat completion and the seconds spent waiting for a concurrency slot"""
+        waited = self._acquire()
+        try:
+            with span('llm_call'):
+                return self._create(api_key, **kwargs), waited
+        finally:
+            self._release()
+
+    def stream(self, api_key, **kwargs):
+        """Yield streamed chat completion chunks, holding a concurrency slot until the stream ends.
+
+        Only opening the stream is retried; a stream that breaks midway raises.
+        """
+        self._acquire()
+        start = time.perf_counter()
+        error = None
+        try:
+            stream = self._create(api_key, stream=True, **kwargs)
+            try:
+                for i, chunk in enumerate(stream):
+                    if i == 0:
+                        observe('llm_first_token', time.perf_counter() - start)
+                    yield chunk
+            finally:
+                stream.close()
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            # A caller that stops reading early still counts as a completed call
+            observe('llm_call', time.perf_counter() - start, error=error)
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        connections = stats['new_connections'] + stats['reused_connections']
+        stats['connection_reuse_rate'] = stats['reused_connections'] / connections if connections else 0.0
+        stats['queue_wait_avg'] = stats['queue_wait_total'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Process-wide pooled OpenAI client"""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = LLMClient()
+    return _llm
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import sys
+import time
 
 # Suppress the tokenizers parallelism warning
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -13,7 +14,12 @@ st.set_page_config(
 )
 
 try:
-    from utils import initialize_vector_store, add_documents_to_vector_store, Handle_pdf, clear_vector_store
+    from utils import initialize_vector_store, clear_vector_store, get_store
+    from ingest_queue import get_ingest_queue
+    from config import ingest_poll_interval, llm_streaming, ui_debug_output
+    from llm_client import get_llm_client
+    from metrics import get_metrics, start_metrics_server
+    from models import warm_up
     from Pages_.chatbot import YourDataChat
 except ImportError as e:
     st.error(f"Import error: {e}")
@@ -53,6 +59,12 @@ st.markdown("""
 # Initialize vector store and session state
 initialize_vector_store()
 
+# Load the embedding model in the background; the page renders without waiting for it
+warm_up()
+
+# Prometheus /metrics endpoint, when metrics_port is set
+start_metrics_server()
+
 # Initialize session state for chat messages
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -61,6 +73,10 @@ if "messages" not in st.session_state:
 if "processed_files" not in st.session_state:
     st.session_state.processed_files = set()
 
+# Background upload jobs submitted by this session
+if "ingest_jobs" not in st.session_state:
+    st.session_state.ingest_jobs = []
+
 # Main header
 st.title("📚 Chat with Your Documents")
 
@@ -83,6 +99,16 @@ with st.sidebar:
         if st.button("Change API Key"):
             del os.environ['OPEN_AI_KEY']
             st.rerun()
+        
+        # Shared OpenAI client health
+        llm_stats = get_llm_client().stats()
+        if ui_debug_output and llm_stats['calls']:
+            with st.expander("📡 OpenAI connection stats"):
+                st.write(f"Calls: {llm_stats['calls']} ({llm_stats['retries']} retries, "
+                         f"{llm_stats['failures']} failed)")
+                st.write(f"Connection reuse: {llm_stats['connection_reuse_rate']:.0%}")
+                st.write(f"Queue wait: avg {llm_stats['queue_wait_avg'] * 1000:.0f} ms, "
+                         f"max {llm_stats['queue_wait_max'] * 1000:.0f} ms")
     
     st.markdown("---")
     
@@ -97,55 +123,64 @@ with st.sidebar:
         key="pdf_uploader"
     )
     
+    ingest_queue = get_ingest_queue()
     if uploaded_files:
-        # Only process new files
-        new_files = [f for f in uploaded_files if f.name not in st.session_state.processed_files]
+        # Only submit new files; anything already in the shared store was ingested by another session
+        store = get_store()
+        in_progress = ingest_queue.active_sources()
+        new_files = [f for f in uploaded_files
+                     if f.name not in st.session_state.processed_files
+                     and f.name not in in_progress and not store.has_source(f.name)]
         
         if new_files:
-            with st.spinner("Processing documents..."):
-                for file in new_files:
-                    temp_path = None
-                    try:
-                        # Debug: File upload info
-                        st.info(f"🔄 Processing file: {file.name} (Size: {file.size} bytes)")
-                        
-                        # Create temporary file
-                        temp_path = f"temp_{file.name.replace(' ', '_')}"
-                        with open(temp_path, "wb") as f:
-                            f.write(file.getbuffer())
-                        
-                        # Process PDF
-                        pdf_handler = Handle_pdf(temp_path)
-                        texts = pdf_handler.read_pdf()
-                        
-                        # Debug: PDF reading results
-                        if texts:
-                            st.success(f"✅ PDF loaded successfully! Found {len(texts)} text sections")
-                            total_chars = sum(len(text) for text in texts)
-                            st.info(f"📊 Total characters extracted: {total_chars:,}")
-                            
-                            # Process the text
-                            success = add_documents_to_vector_store(texts, file.name)
-                            
-                            if success:
-                                st.session_state.processed_files.add(file.name)
-                                st.success(f"🎉 Successfully processed {file.name}")
-                                # Use a targeted rerun to avoid clearing state unnecessarily
-                                st.rerun()
-                            else:
-                                st.error(f"❌ Failed to add {file.name} to vector store")
-                        else:
-                            st.error(f"❌ Failed to extract text from {file.name}")
-                        
-                        # Clean up temporary file
-                        if temp_path and os.path.exists(temp_path):
-                            os.remove(temp_path)
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error processing {file.name}: {str(e)}")
-                        # Clean up temporary file if it exists
-                        if temp_path and os.path.exists(temp_path):
-                            os.remove(temp_path)
+            # Ingestion runs on a background worker; the chat keeps answering from what is already indexed
+            job_id = ingest_queue.submit([(f.name, f.getvalue()) for f in new_files])
+            st.session_state.ingest_jobs.append(job_id)
+            st.session_state.processed_files.update(f.name for f in new_files)
+            st.info(f"🔄 Queued {len(new_files)} file(s) for processing (job {job_id})")
+    
+    # Progress of this session's upload jobs
+    jobs = [job for job in map(ingest_queue.get, st.session_state.ingest_jobs) if job is not None]
+    for job in reversed(jobs):
+        names = ", ".join(source for source, _ in job.files)
+        if job.active:
+            st.write(f"⏳ **{job.status.capitalize()}** ({job.id}): {names}")
+            st.progress(job.progress)
+            for source, (stage, detail) in job.file_status.items():
+                if stage not in ('queued', 'indexed'):
+                    st.caption(f"{source}: {stage} {detail}")
+            if st.button("✖️ Cancel", key=f"cancel_{job.id}"):
+                ingest_queue.cancel(job.id)
+                st.rerun()
+        elif job.status == 'done':
+            for source, (stage, detail) in job.file_status.items():
+                if stage == 'indexed':
+                    st.success(f"🎉 Successfully processed {source}: {detail}")
+                else:
+                    st.error(f"❌ Failed to process {source}: {detail}")
+        elif job.status == 'cancelled':
+            st.warning(f"✖️ Cancelled ({job.id}): {names}")
+        else:
+            st.error(f"❌ Failed to process {names}: {job.error or 'no chunks extracted'}")
+    
+    # Failed or cancelled files can be retried by removing them from the uploader and adding them again
+    uploaded_names = {f.name for f in uploaded_files or []}
+    for job in jobs:
+        if not job.active:
+            st.session_state.processed_files.difference_update(
+                source for source, _ in job.files if source not in job.added and source not in uploaded_names)
+    
+    active_jobs = any(job.active for job in jobs)
+    if active_jobs and st.button("🔄 Refresh status"):
+        st.rerun()
+    
+    # Latency of each pipeline stage in this process
+    stage_stats = get_metrics().summary() if ui_debug_output else {}
+    if stage_stats:
+        with st.expander("⏱️ Stage timings"):
+            st.table([{"stage": stage, "runs": stats['count'], "errors": stats['errors'],
+                       "p50 ms": round(stats['p50_ms'], 1), "p95 ms": round(stats['p95_ms'], 1),
+                       "p99 ms": round(stats['p99_ms'], 1)} for stage, stats in stage_stats.items()])
     
     st.markdown("---")
     
@@ -179,32 +214,56 @@ else:
         
         # Get and display assistant response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    chatbot = YourDataChat()
-                    
-                    # Get context first
+            try:
+                chatbot = YourDataChat()
+                
+                # Get context first
+                with st.spinner("Thinking..."):
                     context = chatbot.get_context(prompt)
-                    
-                    # Generate response
-                    response = chatbot.generate_openai_response(prompt, context)
+                
+                # Generate response
+                if llm_streaming:
+                    # Render tokens as they arrive instead of waiting for the full answer
+                    placeholder = st.empty()
+                    response = ""
+                    for token in chatbot.stream_openai_response(prompt, context):
+                        response += token
+                        placeholder.markdown(response + "▌")
+                    placeholder.markdown(response)
+                else:
+                    with st.spinner("Thinking..."):
+                        response = chatbot.generate_openai_response(prompt, context)
                     
                     # Display response
                     st.write(response)
-                    
-                    # Display references if context was found
-                    if context and context.get('returned_text') and len(context['returned_text']) > 0:
-                        st.markdown("---")
-                        st.markdown("**📚 References:**")
-                        for i, (text, source) in enumerate(zip(context['returned_text'], context['source'])):
-                            with st.expander(f"Reference {i+1} from {source}"):
-                                st.write(text[:1000] + "..." if len(text) > 1000 else text)
-                    
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    
-                except Exception as e:
-                    error_msg = f"Error: {str(e)}"
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    st.error(error_msg)
-
+                
+                # Record and show latency metrics
+                metrics = chatbot.last_metrics
+                st.session_state.setdefault("llm_metrics", []).append(metrics)
+                if metrics.get("cached"):
+                    st.caption("⚡ Answered from cache")
+                elif ui_debug_output and metrics.get("time_to_first_token") is not None:
+                    st.caption(f"⏱️ First token {metrics['time_to_first_token']:.2f}s · "
+                               f"total {metrics['total_latency']:.2f}s")
+                
+                # Display references if context was found
+                if context and context.get('returned_text') and len(context['returned_text']) > 0:
+                    st.markdown("---")
+                    st.markdown("**📚 References:**")
+                    pages = context.get('page') or [None] * len(context['returned_text'])
+                    for i, (text, source, page) in enumerate(zip(context['returned_text'], context['source'], pages)):
+                        location = f"{source}, page {page}" if page is not None else source
+                        with st.expander(f"Reference {i+1} from {location}"):
+                            st.write(text[:1000] + "..." if len(text) > 1000 else text)
+                
+                st.session_state.messages.append({"role": "assistant", "content": response})
+                
+            except Exception as e:
+                error_msg = f"Error: {str(e)}"
+                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                st.error(error_msg)
 
+# Poll upload progress; any widget interaction interrupts the wait and reruns immediately
+if active_jobs and ingest_poll_interval:
+    time.sleep(ingest_poll_interval)
+    st.rerun()
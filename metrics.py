@@ -0,0 +1,185 @@
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from config import metrics_host, metrics_log_path, metrics_port
+
+# Histogram bucket bounds in seconds, from a cached query lookup up to a slow OCR page or LLM answer
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class StageStats:
+    """Latency histogram, counters and a window of recent latencies for one pipeline stage"""
+
+    def __init__(self, window=1000):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.items = 0
+        self.errors = 0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds, items, error):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.items += items
+        self.errors += error is not None
+        self.recent.append(seconds)
+
+
+class Metrics:
+    """Per-stage spans collected in process and exported as Prometheus text or a JSON-lines log.
+
+    Stages that run in ingestion worker processes are recorded with `capture` there and
+    replayed into the parent's registry with `merge`.
+    """
+
+    def __init__(self, log_path=metrics_log_path):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._capture = None
+        self._log = open(log_path, 'a', buffering=1) if log_path else None
+
+    def observe(self, stage, seconds, items=1, error=None):
+        with self._lock:
+            if self._capture is not None:
+                self._capture.append((stage, seconds, items, error))
+                return
+            self._stages.setdefault(stage, StageStats()).add(seconds, items, error)
+            if self._log is not None:
+                self._log.write(json.dumps({'time': time.time(), 'stage': stage, 'seconds': round(seconds, 6),
+                                            'items': items, 'error': error}) + '\n')
+
+    @contextmanager
+    def span(self, stage, items=1):
+        """Time the enclosed block as one observation of `stage`, recording the exception type on failure"""
+        error = None
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, items, error)
+
+    @contextmanager
+    def capture(self):
+        """Collect this process's observations into a list instead of recording them"""
+        events = []
+        with self._lock:
+            self._capture = events
+        try:
+            yield events
+        finally:
+            with self._lock:
+                self._capture = None
+
+    def merge(self, events):
+        for event in events or ():
+            self.observe(*event)
+
+    def summary(self):
+        """{stage: count, errors, items, total seconds and recent p50/p95/p99 in ms}"""
+        with self._lock:
+            stages = {stage: (stats.count, stats.errors, stats.items, stats.sum, list(stats.recent))
+                      for stage, stats in self._stages.items()}
+        summary = {}
+        for stage, (count, errors, items, total, recent) in sorted(stages.items()):
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000 if recent else (0.0, 0.0, 0.0)
+            summary[stage] = {'count': count, 'errors': errors, 'items': items, 'seconds_total': total,
+                              'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+        return summary
+
+    def render_prometheus(self):
+        """Prometheus text exposition of every stage's latency histogram and counters"""
+        with self._lock:
+            stages = sorted((stage, list(stats.buckets), stats.count, stats.sum, stats.items, stats.errors)
+                            for stage, stats in self._stages.items())
+        lines = ['# HELP rag_stage_seconds Latency of pipeline stages.', '# TYPE rag_stage_seconds histogram']
+        for stage, buckets, count, total, _, _ in stages:
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'rag_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'rag_stage_seconds_count{{stage="{stage}"}} {count}')
+        lines += ['# HELP rag_stage_items_total Items (pages, chunks, queries) processed by pipeline stages.',
+                  '# TYPE rag_stage_items_total counter']
+        lines += [f'rag_stage_items_total{{stage="{stage}"}} {items}' for stage, _, _, _, items, _ in stages]
+        lines += ['# HELP rag_stage_errors_total Pipeline stage runs that raised.',
+                  '# TYPE rag_stage_errors_total counter']
+        lines += [f'rag_stage_errors_total{{stage="{stage}"}} {errors}' for stage, _, _, _, _, errors in stages]
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+_server = None
+
+
+def get_metrics():
+    """Process-wide metrics registry"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def span(stage, items=1):
+    return get_metrics().span(stage, items)
+
+
+def observe(stage, seconds, items=1, error=None):
+    get_metrics().observe(stage, seconds, items, error)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = get_metrics().render_prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(get_metrics().summary()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=metrics_port, host=metrics_host):
+    """Serve /metrics (Prometheus) and /metrics.json from a background thread, once per process"""
+    global _server
+    if not port:
+        return None
+    with _metrics_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                # e.g. another app process already serves this port; do not retry on every rerun
+                print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+                _server = False
+                return None
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+            print(f"📈 Serving metrics on http://{host}:{port}/metrics")
+    return _server or None
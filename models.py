@@ -0,0 +1,42 @@
+import threading
+import time
+
+from config import embedding_backend, embedding_model
+
+_models = {}
+_models_lock = threading.Lock()
+_warming = {}
+_warming_lock = threading.Lock()
+
+
+def get_embedding_model(name=embedding_model, backend=embedding_backend):
+    """Process-wide embedding model for the configured backend, loaded on first use and shared by every session"""
+    key = (name, backend)
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                # torch/onnxruntime are only imported once a model is actually needed
+                from embedding_backends import load_embedder
+                start = time.perf_counter()
+                model = load_embedder(name, backend)
+                print(f"🧠 Loaded embedding model '{name}' ({backend}) in {time.perf_counter() - start:.1f}s")
+                _models[key] = model
+    return model
+
+
+def is_loaded(name=embedding_model, backend=embedding_backend):
+    return (name, backend) in _models
+
+
+def warm_up(name=embedding_model, backend=embedding_backend):
+    """Load the embedding model in a background thread so the first question does not wait for it"""
+    key = (name, backend)
+    with _warming_lock:
+        if is_loaded(name, backend) or key in _warming:
+            return _warming.get(key)
+        thread = threading.Thread(target=get_embedding_model, args=key, name='model-warm-up', daemon=True)
+        _warming[key] = thread
+    thread.start()
+    return thread
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+from config import ocr_cache_enabled, ocr_cache_path
+
+# Bump when the OCR recipe changes in a way the settings below don't capture
+OCR_PIPELINE_VERSION = 1
+
+
+def page_image_key(image, settings):
+    """Content address of an OCR result: hash of the rendered page pixels plus OCR settings"""
+    digest = hashlib.sha256()
+    digest.update(f"{OCR_PIPELINE_VERSION}|{image.mode}|{image.size}|{settings}".encode('utf-8'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """On-disk cache of OCR text and detected rotation per rendered page, in SQLite"""
+
+    def __init__(self, path=ocr_cache_path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Several ingestion worker processes may write at once
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS ocr_pages (key TEXT PRIMARY KEY, rotation INTEGER, text TEXT)'
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """Return (text, rotation) or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT text, rotation FROM ocr_pages WHERE key = ?', (key,)).fetchone()
+        return row
+
+    def put(self, key, text, rotation):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO ocr_pages VALUES (?, ?, ?)', (key, rotation, text))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM ocr_pages').fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Per-process OCR cache, or None when caching is disabled"""
+    global _cache
+    if not ocr_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRCache()
+    return _cache
@@ -0,0 +1,211 @@
+import os
+import re
+import warnings
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.utils import open_filename
+from pytesseract import image_to_string, pytesseract
+
+from config import ocr_dpi, ocr_tesseract_threads, ocr_workers
+from metrics import span
+from ocr_cache import get_ocr_cache, page_image_key
+
+OCR_CONFIG = '--quiet'
+
+# Suppress PDF processing warnings
+warnings.filterwarnings("ignore", category=UserWarning)
+logging.getLogger('pdfminer').setLevel(logging.ERROR)
+
+# Tesseract runs as a subprocess per page; cap its OpenMP threads so parallel pages don't oversubscribe the CPU
+if ocr_tesseract_threads:
+    os.environ.setdefault('OMP_THREAD_LIMIT', str(ocr_tesseract_threads))
+
+
+class Handle_pdf:
+    def __init__(self, file):
+        self.file = file
+        self._pdf_bytes = None
+        self.ocr_cache_hits = 0
+
+    @staticmethod
+    def detect_rotation(image):
+        # Use pytesseract to detect orientation
+        try:
+            osd = pytesseract.image_to_osd(image)
+            return int(re.search(r'(?<=Rotate: )\d+', osd).group(0))
+        except:
+            return 0  # If the rotation angle can't be determined, leave the image as it is
+
+    @staticmethod
+    def rotate(image, rotate_angle):
+        # If rotation is detected, correct it
+        if rotate_angle:
+            return image.rotate(360 - rotate_angle, expand=True)
+        return image
+
+    @classmethod
+    def correct_rotation(cls, image):
+        return cls.rotate(image, cls.detect_rotation(image))
+
+    def _is_path(self):
+        return isinstance(self.file, (str, os.PathLike))
+
+    def _load_bytes(self):
+        # File-like inputs are read once up front so OCR threads never share a file position
+        if self._pdf_bytes is None and not self._is_path():
+            self.file.seek(0)
+            self._pdf_bytes = self.file.read()
+
+    def page_count(self):
+        self._load_bytes()
+        info = pdfinfo_from_path(self.file) if self._is_path() else pdfinfo_from_bytes(self._pdf_bytes)
+        return int(info['Pages'])
+
+    def render_page(self, page_number, dpi=ocr_dpi):
+        """Rasterize a single page; other pages are never rendered"""
+        options = dict(dpi=dpi, first_page=page_number, last_page=page_number)
+        if self._is_path():
+            images = convert_from_path(self.file, **options)
+        else:
+            images = convert_from_bytes(self._pdf_bytes, **options)
+        return images[0] if images else None
+
+    def ocr_page(self, page_number, dpi=ocr_dpi):
+        """Render, deskew and OCR one page; returns '' when the page cannot be read.
+
+        Results are cached by the hash of the rendered page, so unchanged pages of a
+        re-ingested document skip tesseract entirely.
+        """
+        try:
+            image = self.render_page(page_number, dpi)
+            if image is None:
+                return ""
+            cache = get_ocr_cache()
+            key = page_image_key(image, f"dpi={dpi}|config={OCR_CONFIG}") if cache is not None else None
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                self.ocr_cache_hits += 1
+                return cached[0]
+            
+            with span('ocr'):
+                rotate_angle = self.detect_rotation(image)
+                text = image_to_string(self.rotate(image, rotate_angle), config=OCR_CONFIG)
+            if cache is not None:
+                cache.put(key, text, rotate_angle)
+            return text
+        except Exception as e:
+            # Continue processing other pages even if one fails
+            print(f"⚠️ OCR failed on page {page_number}: {e}")
+            return ""
+
+    def ocr_pages(self, page_numbers, workers=ocr_workers, dpi=ocr_dpi):
+        """Yield (page_number, text) in order, OCRing up to `workers` pages at a time"""
+        self._load_bytes()
+        workers = workers or os.cpu_count()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for page_number in page_numbers:
+                pending.append((page_number, pool.submit(self.ocr_page, page_number, dpi)))
+                # Keep a bounded window in flight so rendered pages don't pile up in memory
+                while len(pending) > 2 * workers:
+                    done_page, future = pending.popleft()
+                    yield done_page, future.result()
+            while pending:
+                done_page, future = pending.popleft()
+                yield done_page, future.result()
+
+    def extract_text_from_image_pdf(self, pdf_file=None):
+        """OCR every page of an image-only PDF in parallel"""
+        handler = Handle_pdf(pdf_file) if pdf_file is not None else self
+        try:
+            pages = handler.ocr_pages(range(1, handler.page_count() + 1))
+            return [text for _, text in pages if text.strip()]
+        except Exception as e:
+            print(f"❌ Error processing image-based PDF: {e}")
+            return []
+
+    def iter_page_texts(self):
+        """Yield (page_number, text) for every page, parsing one page at a time"""
+        self._load_bytes()
+        source = self.file if self._is_path() else BytesIO(self._pdf_bytes)
+        with open_filename(source, "rb") as fp, StringIO() as output:
+            rsrcmgr = PDFResourceManager(caching=True)
+            device = TextConverter(rsrcmgr, output, codec='utf-8', laparams=LAParams())
+            interpreter = PDFPageInterpreter(rsrcmgr, device)
+            for page_number, page in enumerate(PDFPage.get_pages(fp, caching=True), start=1):
+                interpreter.process_page(page)
+                yield page_number, output.getvalue()
+                # Only the current page's text is ever held in memory
+                output.seek(0)
+                output.truncate(0)
+            device.close()
+
+    def read_pages(self, ocr=True, workers=ocr_workers, dpi=ocr_dpi):
+        """Stream (page_number, text) in page order.
+
+        Pages without a text layer are rasterized and OCRed in the background while
+        text extraction continues; at most 2 * `workers` such pages are in flight.
+        A document that cannot be read to the end raises after the pages read so far.
+        """
+        try:
+            # Debug: Starting PDF reading
+            print(f"📖 Reading PDF: {self.file}")
+            
+            total_chars = 0
+            ocr_page_count = 0
+            workers = workers or os.cpu_count()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = deque()  # (page_number, text or OCR future), in page order
+                
+                def ready(draining):
+                    if not pending:
+                        return False
+                    head = pending[0][1]
+                    ocr_in_flight = sum(1 for _, item in pending if not isinstance(item, str))
+                    return draining or isinstance(head, str) or head.done() or ocr_in_flight > 2 * workers
+                
+                def emit(draining=False):
+                    while ready(draining):
+                        done_page, item = pending.popleft()
+                        text = item if isinstance(item, str) else item.result()
+                        if text.strip():
+                            yield done_page, text
+                
+                for page_number, text in self.iter_page_texts():
+                    if text and text.strip():
+                        pending.append((page_number, text))
+                    elif ocr:
+                        # No text layer on this page: fall back to OCR for this page only
+                        ocr_page_count += 1
+                        pending.append((page_number, pool.submit(self.ocr_page, page_number, dpi)))
+                    for done_page, done_text in emit():
+                        total_chars += len(done_text)
+                        yield done_page, done_text
+                
+                for done_page, done_text in emit(draining=True):
+                    total_chars += len(done_text)
+                    yield done_page, done_text
+            
+            if total_chars:  # If text extraction was successful
+                print(f"✅ Text extraction successful! Extracted {total_chars} characters"
+                      + (f" ({ocr_page_count} pages via OCR, {self.ocr_cache_hits} from cache)"
+                         if ocr_page_count else ""))
+            else:
+                print(f"❌ No text found in PDF, even with OCR")
+                
+        except Exception as e:
+            # Callers must not index a document that stopped partway as if it were complete
+            print(f"❌ Error reading PDF: {e}")
+            raise
+
+    def read_pdf(self):
+        """Text of each page, OCRing pages that have no text layer"""
+        return [text for _, text in self.read_pages()]
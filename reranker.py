@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import rerank_batch_size, rerank_cache_size, rerank_latency_budget, rerank_model
+
+
+class Reranker:
+    """Cross-encoder rescoring of retrieved chunks against the query.
+
+    All uncached (query, chunk) pairs are scored in one batched predict call, and scores
+    are cached by (query, chunk ID), which is safe because a chunk ID always names the
+    same text. Throughput is tracked so that a rerank expected to take longer than
+    `latency_budget` seconds is skipped and the retrieval order is kept instead.
+    """
+
+    def __init__(self, model_name=rerank_model, latency_budget=rerank_latency_budget,
+                 batch_size=rerank_batch_size, cache_size=rerank_cache_size):
+        self.model_name = model_name
+        self.latency_budget = latency_budget
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._lock = threading.Lock()
+        self._scores = OrderedDict()  # (query, chunk ID) -> score, least recently used first
+        self._seconds_per_pair = None
+        self.skipped = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def _cached(self, keys):
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    found[key] = self._scores[key]
+            return found
+
+    def _remember(self, scores, seconds, pairs):
+        with self._lock:
+            self._scores.update(scores)
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+            rate = seconds / pairs
+            # Smoothed cost per pair, used to predict the next rerank's latency
+            self._seconds_per_pair = rate if self._seconds_per_pair is None else 0.8 * self._seconds_per_pair + 0.2 * rate
+
+    def rerank(self, query, results, top_k):
+        """Reorder (score, chunk_id, text, source, page) results by cross-encoder score and keep top_k.
+
+        When scoring every candidate would blow the latency budget, only the leading candidates
+        that fit are reranked and the rest keep their retrieval order behind them, scored below
+        the lowest reranked one so that sorting by score cannot lift them above it.
+        """
+        if len(results) <= 1:
+            return results[:top_k]
+        keys = [(query, result[1]) for result in results]
+        scores = self._cached(keys)
+
+        head = len(results)
+        if self._seconds_per_pair is not None:
+            affordable = int(self.latency_budget / self._seconds_per_pair)
+            uncached = 0
+            for i, key in enumerate(keys):
+                if key not in scores:
+                    uncached += 1
+                    if uncached > affordable:
+                        head = i
+                        break
+            if head < 2:
+                self.skipped += 1
+                print(f"⏭️ Skipping rerank: scoring would exceed the {self.latency_budget:.2f}s budget")
+                return results[:top_k]
+
+        missing = [(key, result[2]) for key, result in zip(keys[:head], results[:head]) if key not in scores]
+        if missing:
+            model = self.model
+            start = time.perf_counter()
+            predicted = model.predict([(query, text) for _, text in missing], batch_size=self.batch_size)
+            new_scores = {key: float(score) for (key, _), score in zip(missing, predicted)}
+            self._remember(new_scores, time.perf_counter() - start, len(missing))
+            scores.update(new_scores)
+
+        reranked = [(scores[key],) + result[1:] for key, result in zip(keys[:head], results[:head])]
+        reranked.sort(key=lambda result: result[0], reverse=True)
+        # Retrieval scores are on another scale than cross-encoder logits; rank the tail below every reranked chunk
+        floor = reranked[-1][0]
+        tail = [(floor - rank - 1,) + result[1:] for rank, result in enumerate(results[head:top_k])]
+        return (reranked + tail)[:top_k]
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Process-wide reranker; the cross-encoder itself loads on first use"""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
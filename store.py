@@ -0,0 +1,621 @@
+import os
+import pickle
+import tempfile
+import threading
+
+import faiss
+import numpy as np
+
+from ann_index import backend_of, build_index, configure_search, extract_vectors, memory_bytes, needs_retrain, \
+    new_index, removal_selector, storage_of, supports_removal, target_backend, target_storage
+from config import embedding_model, rescore_factor, vector_store_dir, vector_store_mmap
+from dedup import MinHashIndex
+from chunk_store import ChunkStore
+from embedding_backends import embedding_id
+from embedding_cache import chunk_key, get_embedding_cache
+from lexical_index import BM25Index
+from metrics import span
+
+
+class ReadWriteLock:
+    """Many concurrent readers or a single writer"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class _Reading:
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire_read()
+
+    def __exit__(self, *exc):
+        self.lock.release_read()
+
+
+class _Writing:
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire_write()
+
+    def __exit__(self, *exc):
+        self.lock.release_write()
+
+
+class VectorStore:
+    """FAISS index and chunk metadata shared by every session and persisted to disk.
+
+    Every chunk gets a stable integer ID that is used as its FAISS label, so chunks
+    and whole documents can be removed from the index without re-embedding the rest.
+    Chunk text lives in a SQLite `ChunkStore` next to the index and is read by ID
+    when results are returned; memory holds only each chunk's source and page.
+    The index starts as an exact flat scan and is retrained into an ANN backend
+    (see `ann_index.target_backend`) once the corpus is large enough. A BM25
+    inverted index over the same chunks is kept in step for keyword search.
+    Near-duplicate chunks skipped at ingest are recorded as links from their
+    document to the stored chunk they repeat (see `dedup.Deduplicator`).
+    With compressed vector storage (`vector_storage`), search re-scores its top
+    candidates with the exact vectors kept in the embedding cache.
+
+    `dimension` may be left out: it is then taken from the persisted index or from
+    the first embeddings added, so the store can serve before the model is loaded.
+    """
+
+    def __init__(self, dimension=None, directory=vector_store_dir):
+        self.dimension = dimension
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.faiss')
+        self.chunks_path = os.path.join(directory, 'chunks.sqlite')
+        self.metadata_path = os.path.join(directory, 'metadata.pkl')  # pickled metadata of older stores
+        self._lock = ReadWriteLock()
+        self._save_lock = threading.Lock()  # saves only read the store, but must not overlap each other
+        self._mmapped = False
+        self._chunk_store = None
+        self.index = self._new_index() if dimension else None
+        self.chunks = {}        # chunk ID -> (source, page number or None)
+        self.source_ids = {}    # source -> set of chunk IDs
+        self.tombstones = set()  # IDs deleted from the metadata but still in an HNSW graph
+        self.links = {}         # chunk ID -> [(source, page)] of near-duplicates that were not stored
+        self.source_links = {}  # source -> set of chunk IDs it links to
+        self.next_id = 0
+        self.embedding_id = embedding_id()  # model and backend variant the stored vectors came from
+        self._lexical = None
+        self._minhash = None    # MinHash LSH over chunk texts, built on the first dedup lookup
+        self._minhash_lock = threading.Lock()
+        self._listeners = []
+
+    def _new_index(self):
+        return new_index('flat', self.dimension, storage=target_storage('flat', 0))
+
+    @property
+    def backend(self):
+        return backend_of(self.index) if self.index is not None else 'flat'
+
+    @property
+    def storage(self):
+        return storage_of(self.index) if self.index is not None else 'float32'
+
+    def memory_bytes(self):
+        """Approximate memory held by the vector index"""
+        with self.reading():
+            return memory_bytes(self.index) if self.index is not None else 0
+
+    def reading(self):
+        return _Reading(self._lock)
+
+    def writing(self):
+        return _Writing(self._lock)
+
+    @property
+    def ntotal(self):
+        return len(self.chunks)
+
+    def subscribe(self, callback):
+        """Call `callback(sources)` whenever chunks of those sources are added or removed (None: all)"""
+        self._listeners.append(callback)
+
+    def _notify(self, sources):
+        for callback in self._listeners:
+            callback(sources)
+
+    @property
+    def texts(self):
+        """The chunk store holding chunk text, opened on first use"""
+        if self._chunk_store is None:
+            self._chunk_store = ChunkStore(self.chunks_path)
+        return self._chunk_store
+
+    @property
+    def lexical(self):
+        """BM25 index over the chunk texts, with its postings in the chunk store"""
+        if self._lexical is None:
+            self._lexical = BM25Index(self.texts)
+        return self._lexical
+
+    def _index_missing_postings(self):
+        """Tokenize chunks that have no BM25 postings yet; returns how many there were"""
+        indexed = 0
+        batch = []
+        for row in self.texts.unindexed_rows():
+            batch.append(row)
+            if len(batch) >= 2000:
+                self.lexical.add_many(batch)
+                indexed += len(batch)
+                batch = []
+        self.lexical.add_many(batch)
+        return indexed + len(batch)
+
+    def _migrate_metadata(self):
+        """Move a pickled metadata file into the chunk store; returns whether it predates chunk IDs"""
+        with open(self.metadata_path, 'rb') as f:
+            metadata = pickle.load(f)
+        unlabelled = 'ids' not in metadata
+        ids = metadata.get('ids') or list(range(len(metadata['texts'])))
+        pages = metadata.get('pages') or [None] * len(ids)
+        self.texts.clear()
+        self.texts.add(zip(ids, metadata['texts'], metadata['sources'], pages))
+        self.texts.set_links(metadata.get('links', {}))
+        self.texts.set_setting('tombstones', list(metadata.get('tombstones', ())))
+        self.texts.set_setting('model', metadata.get('model', embedding_model))
+        if 'next_id' in metadata:
+            self.texts.set_setting('next_id', metadata['next_id'])
+        print(f"📦 Moved {len(ids)} chunks from '{self.metadata_path}' into '{self.chunks_path}'")
+        return unlabelled
+
+    def load(self):
+        """Load the persisted index and chunk metadata, memory-mapping the index when enabled"""
+        migrate = os.path.exists(self.metadata_path)
+        if not (os.path.exists(self.index_path) and (migrate or os.path.exists(self.chunks_path))):
+            return False
+
+        with self.writing():
+            index = None
+            if vector_store_mmap:
+                try:
+                    flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+                    index = faiss.read_index(self.index_path, flags)
+                    self._mmapped = True
+                except RuntimeError:
+                    index = None
+            if index is None:
+                index = faiss.read_index(self.index_path)
+                self._mmapped = False
+
+            unlabelled = self._migrate_metadata() if migrate else False
+
+            tombstones = set(self.texts.get_setting('tombstones', []))
+            if self.texts.get_setting('model', embedding_model) != embedding_model or \
+                    (self.dimension is not None and index.d != self.dimension):
+                print(f"⚠️ Ignoring persisted vector store in '{self.directory}': it does not match the embedding model")
+                self._mmapped = False
+                # Uncommitted: the old chunks stay on disk until this store is saved
+                self.texts.clear()
+                return False
+            rows = self.texts.count() + len(tombstones)
+            expected = self.texts.get_setting('index_ntotal', rows)
+            if index.ntotal != expected or index.ntotal != rows:
+                self._mmapped = False
+                raise RuntimeError(f"Vector store in '{self.directory}' is inconsistent: the index holds "
+                                   f"{index.ntotal} vectors but the chunk store expects {expected} for {rows} rows, "
+                                   f"probably from an interrupted save. Restore a backup or delete the directory "
+                                   f"and ingest the documents again.")
+            self.dimension = index.d
+
+            if unlabelled:
+                # Stores written before chunk IDs existed hold a plain IndexFlatIP; label rows 0..n-1
+                vectors = index.reconstruct_n(0, index.ntotal)
+                index = self._new_index()
+                index.add_with_ids(vectors, np.arange(len(vectors), dtype='int64'))
+                self._mmapped = False
+
+            self.index = index
+            configure_search(self.index)
+            self.tombstones = tombstones
+            self.chunks = {}
+            self.source_ids = {}
+            self._minhash = None
+            for chunk_id, source, page in self.texts.metadata():
+                self.chunks[chunk_id] = (source, page)
+                self.source_ids.setdefault(source, set()).add(chunk_id)
+            # Stores written before BM25 postings were persisted are indexed once, then saved
+            self._lexical = BM25Index(self.texts)
+            backfilled = self._index_missing_postings()
+            if backfilled:
+                print(f"🔤 Built keyword index postings for {backfilled} chunks")
+            self.links = {}
+            self.source_links = {}
+            for chunk_id, occurrences in self.texts.links().items():
+                self._link(chunk_id, occurrences)
+            self.next_id = self.texts.get_setting('next_id', max(self.chunks, default=-1) + 1)
+            self.embedding_id = self.texts.get_setting('embedding_id', embedding_model)
+            if self.embedding_id != embedding_id():
+                print(f"⚠️ The vector store in '{self.directory}' holds '{self.embedding_id}' embeddings but "
+                      f"'{embedding_id()}' is configured; dense search is off and new documents are refused "
+                      f"until you run `python embedding_backends.py reembed`")
+
+        if migrate or backfilled:
+            self.save()
+        if migrate:
+            os.remove(self.metadata_path)
+        print(f"📂 Loaded vector store with {self.ntotal} chunks ({self.backend} index, {self.storage} vectors) from '{self.directory}'")
+        return True
+
+    def save(self):
+        """Write the index and commit the chunk store.
+
+        Chunk rows and links were already written as they were added; saving only
+        commits them with the few store-wide settings, so its cost no longer grows
+        with the corpus text. The index is replaced before the commit, which records
+        its size: an interrupted save is detected by `load` instead of pairing an
+        old index with new chunk rows.
+        """
+        with self._save_lock, self.reading():
+            if self.index is None:
+                # Nothing was ever added or loaded; an empty store is no index file at all
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+                if self._chunk_store is not None:
+                    self.texts.commit()
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            fd, index_tmp = tempfile.mkstemp(prefix='index.', suffix='.tmp', dir=self.directory)
+            os.close(fd)
+            try:
+                faiss.write_index(self.index, index_tmp)
+                os.replace(index_tmp, self.index_path)
+                self.texts.set_setting('next_id', self.next_id)
+                self.texts.set_setting('tombstones', sorted(self.tombstones))
+                self.texts.set_setting('model', embedding_model)
+                self.texts.set_setting('embedding_id', self.embedding_id)
+                self.texts.set_setting('index_ntotal', self.index.ntotal)
+                self.texts.commit()
+            finally:
+                if os.path.exists(index_tmp):
+                    os.remove(index_tmp)
+
+    def _ensure_writable(self):
+        # A memory-mapped index is read-only; pull it into memory before the first write
+        if self._mmapped:
+            self.index = faiss.read_index(self.index_path)
+            configure_search(self.index)
+            self._mmapped = False
+
+    def _exact_vectors(self, chunk_ids):
+        """{chunk ID: float32 vector} for the chunks whose original embedding is in the embedding cache"""
+        cache = get_embedding_cache()
+        if cache is None:
+            return {}
+        texts = self.texts.texts([chunk_id for chunk_id in chunk_ids if chunk_id in self.chunks])
+        keys = {chunk_id: chunk_key(text) for chunk_id, text in texts.items()}
+        found = cache.get_many(list(keys.values()))
+        return {chunk_id: found[key] for chunk_id, key in keys.items() if key in found}
+
+    def cached_vectors(self, chunk_ids):
+        """Exact embeddings of the given chunks that are in the embedding cache"""
+        with self.reading():
+            return self._exact_vectors(chunk_ids)
+
+    def _build_minhash(self):
+        """Index every stored chunk for near-duplicate lookups without holding the store lock"""
+        with self._minhash_lock:
+            if self._minhash is not None:
+                return
+            minhash = MinHashIndex()
+            for chunk_id, text, _, _ in self.texts.rows():
+                minhash.add(chunk_id, text)
+            with self.writing():
+                # Catch up with chunks added or removed while the index was being built
+                for chunk_id in [chunk_id for chunk_id in minhash.signatures if chunk_id not in self.chunks]:
+                    minhash.remove(chunk_id)
+                missing = [chunk_id for chunk_id in self.chunks if chunk_id not in minhash.signatures]
+                for chunk_id, text in self.texts.texts(missing).items():
+                    minhash.add(chunk_id, text)
+                self._minhash = minhash
+
+    def near_duplicate(self, sig):
+        """(chunk ID, estimated Jaccard similarity) of the stored chunk closest to a MinHash signature"""
+        while True:
+            with self.reading():
+                if self._minhash is not None:
+                    return self._minhash.best_match(sig)
+            self._build_minhash()
+
+    def _link(self, chunk_id, occurrences):
+        for source, page in occurrences:
+            self.links.setdefault(chunk_id, []).append((source, page))
+            self.source_links.setdefault(source, set()).add(chunk_id)
+
+    def link(self, source, occurrences):
+        """Record [(chunk ID, page)] of `source` whose text repeats an already stored chunk"""
+        with self.writing():
+            occurrences = [(chunk_id, page) for chunk_id, page in occurrences if chunk_id in self.chunks]
+            for chunk_id, page in occurrences:
+                self._link(chunk_id, [(source, page)])
+            self.texts.add_links((chunk_id, source, page) for chunk_id, page in occurrences)
+
+    def _unlink_source(self, source):
+        self.texts.unlink(source=source)
+        for chunk_id in self.source_links.pop(source, ()):
+            remaining = [occurrence for occurrence in self.links.get(chunk_id, ()) if occurrence[0] != source]
+            if remaining:
+                self.links[chunk_id] = remaining
+            else:
+                self.links.pop(chunk_id, None)
+
+    def _unlink_chunk(self, chunk_id):
+        if chunk_id in self.links:
+            self.texts.unlink(chunk_id=chunk_id)
+        for source, _ in self.links.pop(chunk_id, ()):
+            linked = self.source_links.get(source)
+            if linked is not None:
+                linked.discard(chunk_id)
+                if not linked:
+                    del self.source_links[source]
+
+    def _rebuild(self, backend, storage='float32'):
+        """Retrain the index as `backend` from the vectors it already holds"""
+        ids, vectors = extract_vectors(self.index)
+        if self.tombstones:
+            keep = ~np.isin(ids, np.fromiter(self.tombstones, dtype='int64'))
+            ids, vectors = ids[keep], vectors[keep]
+        if self.storage != 'float32':
+            # Compressed codes only approximate the originals; start from exact vectors where they are cached
+            exact = self._exact_vectors(ids.tolist())
+            for row, chunk_id in enumerate(ids.tolist()):
+                if chunk_id in exact:
+                    vectors[row] = exact[chunk_id]
+        print(f"🏗️ Building {backend} index ({storage} vectors) over {len(ids)} chunks")
+        self.index = build_index(backend, self.dimension, ids, vectors, storage=storage)
+        self.tombstones = set()
+
+    def _maybe_rebuild(self):
+        backend = target_backend(len(self.chunks))
+        # Never fall back to flat when the corpus shrinks: PQ codes cannot be turned back into exact vectors
+        if backend == 'flat':
+            backend = self.backend
+        storage = target_storage(backend, len(self.chunks), current=self.storage)
+        if backend == 'ivf' and storage == 'pq':
+            backend = 'ivfpq'
+        if backend != self.backend or storage != self.storage or needs_retrain(self.index, len(self.chunks)):
+            self._rebuild(backend, storage)
+        elif self.tombstones and len(self.tombstones) > 0.1 * self.index.ntotal:
+            # Compact an HNSW graph once a tenth of it is deleted chunks
+            self._rebuild(backend, storage)
+
+    def add(self, embeddings, texts, source, pages=None):
+        """Append chunk embeddings and their metadata, returning the new chunk IDs"""
+        pages = pages if pages is not None else [None] * len(texts)
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        with span('index_add', items=len(texts)), self.writing():
+            if not self.chunks:
+                self.embedding_id = embedding_id()
+            elif self.embedding_id != embedding_id():
+                raise RuntimeError(f"The vector store holds '{self.embedding_id}' embeddings, not the configured "
+                                   f"'{embedding_id()}'; run `python embedding_backends.py reembed` first")
+            if self.index is None:
+                self.dimension = embeddings.shape[1]
+                self.index = self._new_index()
+            self._ensure_writable()
+            ids = np.arange(self.next_id, self.next_id + len(texts), dtype='int64')
+            self.index.add_with_ids(embeddings, ids)
+            self.next_id += len(texts)
+            ids = ids.tolist()
+            source = self.texts.intern(source)
+            self.texts.add((chunk_id, text, source, page) for chunk_id, text, page in zip(ids, texts, pages))
+            self.lexical.add_many(zip(ids, texts))
+            for chunk_id, text, page in zip(ids, texts, pages):
+                self.chunks[chunk_id] = (source, page)
+                if self._minhash is not None:
+                    self._minhash.add(chunk_id, text)
+            self.source_ids.setdefault(source, set()).update(ids)
+            self._maybe_rebuild()
+        self._notify({source})
+        return ids
+
+    def reindex(self, chunk_ids, embeddings, vectors_id=None):
+        """Replace the vectors of every chunk (e.g. after switching embedding backend), keeping IDs and metadata.
+
+        `vectors_id` is the `embedding_id` of the new vectors, the configured one by default.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        with self.writing():
+            if set(chunk_ids) != set(self.chunks):
+                raise ValueError("reindex needs a vector for every chunk in the store")
+            self.embedding_id = vectors_id or embedding_id()
+            self.dimension = embeddings.shape[1]
+            backend = target_backend(len(chunk_ids))
+            # Keep an ANN backend the store already grew into, as _maybe_rebuild does
+            if backend == 'flat' and self.index is not None:
+                backend = self.backend
+            storage = target_storage(backend, len(chunk_ids))
+            if backend == 'ivf' and storage == 'pq':
+                backend = 'ivfpq'
+            self.index = build_index(backend, self.dimension, chunk_ids, embeddings, storage=storage)
+            self.tombstones = set()
+            self._mmapped = False
+        self._notify(None)
+
+    def remove_ids(self, chunk_ids):
+        """Remove chunks by ID from the index and metadata; no re-embedding involved"""
+        with self.writing():
+            chunk_ids = [chunk_id for chunk_id in chunk_ids if chunk_id in self.chunks]
+            if not chunk_ids:
+                return 0
+            self._ensure_writable()
+            if supports_removal(self.index):
+                self.index.remove_ids(removal_selector(self.index, chunk_ids))
+            else:
+                self.tombstones.update(chunk_ids)
+            sources = set()
+            texts = self.texts.texts(chunk_ids)
+            self.texts.remove(chunk_ids)
+            self.lexical.remove_many(texts.items())
+            for chunk_id in chunk_ids:
+                source, _ = self.chunks.pop(chunk_id)
+                if self._minhash is not None:
+                    self._minhash.remove(chunk_id)
+                self._unlink_chunk(chunk_id)
+                sources.add(source)
+                ids = self.source_ids[source]
+                ids.discard(chunk_id)
+                if not ids:
+                    del self.source_ids[source]
+            self._maybe_rebuild()
+        self._notify(sources)
+        return len(chunk_ids)
+
+    def remove_source(self, source):
+        """Remove every chunk of a document.
+
+        A chunk that other documents link to as a near-duplicate is handed over to
+        the first of them instead of being removed. Returns the number of chunks
+        removed or handed over plus the document's own near-duplicate links dropped.
+        """
+        with self.writing():
+            unlinked = len(self.source_links.get(source, ()))
+            self._unlink_source(source)
+            chunk_ids, handed_over = [], 0
+            for chunk_id in list(self.source_ids.get(source, ())):
+                if chunk_id not in self.links:
+                    chunk_ids.append(chunk_id)
+                    continue
+                (new_source, page), *rest = self.links.pop(chunk_id)
+                self.chunks[chunk_id] = (new_source, page)
+                self.texts.reassign(chunk_id, new_source, page)
+                self.texts.unlink(chunk_id=chunk_id, source=new_source)
+                self.source_ids[source].discard(chunk_id)
+                self.source_ids.setdefault(new_source, set()).add(chunk_id)
+                self.source_links[new_source].discard(chunk_id)
+                if not self.source_links[new_source]:
+                    del self.source_links[new_source]
+                rest = [occurrence for occurrence in rest if occurrence[0] != new_source]
+                if rest:
+                    self.links[chunk_id] = rest
+                handed_over += 1
+            if not self.source_ids.get(source, True):
+                del self.source_ids[source]
+        removed = self.remove_ids(chunk_ids)
+        if handed_over or unlinked:
+            self._notify({source})
+        return removed + handed_over + unlinked
+
+    def clear(self):
+        with self.writing():
+            self.index = self._new_index() if self.dimension else None
+            self.chunks = {}
+            self.source_ids = {}
+            self.tombstones = set()
+            self.links = {}
+            self.source_links = {}
+            self.lexical.clear()
+            self.texts.clear()
+            self._minhash = None
+            self._mmapped = False
+            self.embedding_id = embedding_id()
+        self._notify(None)
+
+    def search(self, query_embeddings, top_k):
+        """Return (score, chunk_id, text, source, page) tuples for the first query"""
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32')
+        with self.reading():
+            # Vectors of another embedding variant are not comparable with the query; see load()
+            if self.index is None or self.index.ntotal == 0 or self.embedding_id != embedding_id():
+                return []
+            # Compressed vectors only approximate scores; fetch extra candidates to re-score exactly
+            rescore = self.storage != 'float32' and rescore_factor > 1
+            candidates = top_k * rescore_factor if rescore else top_k
+            # Over-fetch so that deleted-but-not-compacted chunks do not eat into top_k
+            k = min(candidates + min(len(self.tombstones), 4 * top_k), self.index.ntotal)
+            scores, labels = self.index.search(query_embeddings, k)
+            hits = [(float(score), int(chunk_id)) for score, chunk_id in zip(scores[0], labels[0])
+                    if int(chunk_id) in self.chunks]
+            if rescore and hits:
+                exact = self._exact_vectors([chunk_id for _, chunk_id in hits])
+                query = query_embeddings[0]
+                hits = [(float(exact[chunk_id] @ query), chunk_id) if chunk_id in exact else (score, chunk_id)
+                        for score, chunk_id in hits]
+                hits.sort(key=lambda hit: hit[0], reverse=True)
+            return self._with_chunks(hits[:top_k])
+
+    def _with_chunks(self, hits):
+        """(score, chunk_id) pairs -> (score, chunk_id, text, source, page) tuples"""
+        texts = self.texts.texts([chunk_id for _, chunk_id in hits])
+        return [(score, chunk_id, texts[chunk_id]) + self.chunks[chunk_id] for score, chunk_id in hits]
+
+    def lexical_search(self, query, top_k):
+        """BM25 keyword search; returns (score, chunk_id, text, source, page) tuples"""
+        with self.reading():
+            return self._with_chunks(self.lexical.search(query, top_k))
+
+    def keyword_matches(self, query):
+        """IDs of the chunks that contain every term of `query`"""
+        with self.reading():
+            return self.lexical.matching(query)
+
+    def has_source(self, source):
+        with self.reading():
+            return source in self.source_ids or source in self.source_links
+
+    def source_counts(self):
+        """Number of chunks per document, counting near-duplicates linked to another document's chunk"""
+        with self.reading():
+            counts = {source: len(ids) for source, ids in self.source_ids.items()}
+            for source, ids in self.source_links.items():
+                counts[source] = counts.get(source, 0) + len(ids)
+            return counts
+
+    def snapshot(self):
+        """Consistent copies of the chunk IDs, texts, sources and page numbers for display"""
+        with self.reading():
+            ids, texts, sources, pages = [], [], [], []
+            for chunk_id, text, source, page in self.texts.rows():
+                ids.append(chunk_id)
+                texts.append(text)
+                sources.append(source)
+                pages.append(page)
+            return ids, texts, sources, pages
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store(dimension=None):
+    """Return the process-wide vector store, loading it from disk on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = VectorStore(dimension)
+                store.load()
+                _store = store
+    return _store